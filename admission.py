@@ -0,0 +1,185 @@
+"""Admission control and load shedding for tool calls.
+
+`AdmissionControlMiddleware` caps how many tool calls run at once, per
+tool and across the server. A call that finds its limit reached waits in a
+bounded FIFO queue until a slot frees up or its deadline passes. If the
+queue is full or the deadline passes first, the call fails fast with a
+retryable `Overloaded` error instead of piling up behind slow work and
+dragging everyone's latency up.
+
+A call takes its per-tool slot first and the global slot second, so a
+call waiting on a busy tool never holds a global slot.
+
+    mcp.add_middleware(AdmissionControlMiddleware(
+        global_limit=Limit(concurrency=64, queue=128, timeout=1.0),
+        tool_limits={"get_weather": Limit(concurrency=8, queue=16, timeout=0.5)},
+    ))
+
+Queue depth, slots in use, wait time and rejections are exported through
+metrics.py (`mcp_admission_*`).
+"""
+
+import asyncio
+import contextlib
+from collections import deque
+from dataclasses import dataclass
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from mcp import McpError
+from mcp.types import ErrorData
+
+from metrics import REGISTRY
+
+# JSON-RPC server-defined error range; 429 as in HTTP Too Many Requests
+OVERLOADED = -32029
+
+MAX_TOOL_GATES = 1000
+
+ADMISSION_IN_USE = REGISTRY.gauge(
+    "mcp_admission_in_use", "Tool call slots in use.", ["scope"])
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge(
+    "mcp_admission_queue_depth", "Tool calls waiting for a slot.", ["scope"])
+ADMISSION_WAIT = REGISTRY.histogram(
+    "mcp_admission_wait_seconds", "Time admitted tool calls spent queued.", ["scope"])
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    "mcp_admission_rejections_total", "Tool calls shed, by scope and reason.", ["scope", "reason"])
+
+
+@dataclass(frozen=True)
+class Limit:
+    concurrency: int
+    # callers allowed to wait for a slot; beyond that calls are rejected at once
+    queue: int = 0
+    # longest a caller waits for a slot, in seconds
+    timeout: float = 1.0
+
+
+class Overloaded(McpError):
+    """Raised when a call is shed; safe to retry after `retry_after` seconds."""
+
+    def __init__(self, scope: str, reason: str, retry_after: float):
+        self.scope = scope
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(ErrorData(
+            code=OVERLOADED,
+            message=f"Server busy ({scope}: {reason}), retry after {retry_after:g}s",
+            data={"retryable": True, "retry_after": retry_after, "scope": scope, "reason": reason},
+        ))
+
+
+class _Gate:
+    """A counting semaphore with a bounded FIFO wait queue."""
+
+    def __init__(self, scope: str, limit: Limit):
+        self.scope = scope
+        self.limit = limit
+        self.active = 0
+        self.waiters: deque[asyncio.Future] = deque()
+        self.rejected = 0
+        self._in_use = ADMISSION_IN_USE.labels(scope)
+        self._depth = ADMISSION_QUEUE_DEPTH.labels(scope)
+        self._wait = ADMISSION_WAIT.labels(scope)
+
+    async def acquire(self, deadline: float) -> None:
+        if self.active < self.limit.concurrency and not self.waiters:
+            self.active += 1
+            self._in_use.set(self.active)
+            return
+        if len(self.waiters) >= self.limit.queue:
+            self._reject("queue_full")
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self.waiters.append(waiter)
+        self._depth.set(len(self.waiters))
+        queued_at = loop.time()
+        try:
+            async with asyncio.timeout_at(deadline):
+                await waiter
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over as the deadline hit: pass it on
+                self.release()
+            else:
+                # release() may already have popped (and skipped) our
+                # cancelled waiter
+                with contextlib.suppress(ValueError):
+                    self.waiters.remove(waiter)
+            self._depth.set(len(self.waiters))
+            if isinstance(e, TimeoutError):
+                self._reject("queue_timeout")
+            raise
+        self._depth.set(len(self.waiters))
+        self._wait.observe(loop.time() - queued_at)
+
+    def release(self) -> None:
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                # hand the slot straight to the next caller; `active` is unchanged
+                waiter.set_result(None)
+                return
+        self.active -= 1
+        self._in_use.set(self.active)
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        ADMISSION_REJECTIONS.labels(self.scope, reason).inc()
+        raise Overloaded(self.scope, reason, retry_after=self.limit.timeout)
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.limit.concurrency,
+            "active": self.active,
+            "queued": len(self.waiters),
+            "rejected": self.rejected,
+        }
+
+
+class AdmissionControlMiddleware(Middleware):
+    """Per-tool and global concurrency limits for tools/call with load shedding."""
+
+    def __init__(
+        self,
+        global_limit: Limit | None = Limit(concurrency=64, queue=128, timeout=1.0),
+        tool_limits: dict[str, Limit] | None = None,
+        default_tool_limit: Limit | None = None,
+    ):
+        self.global_gate = _Gate("global", global_limit) if global_limit else None
+        self.tool_limits = dict(tool_limits or {})
+        self.default_tool_limit = default_tool_limit
+        self._tool_gates: dict[str, _Gate] = {}
+
+    def _tool_gate(self, name: str) -> _Gate | None:
+        gate = self._tool_gates.get(name)
+        if gate is None:
+            limit = self.tool_limits.get(name, self.default_tool_limit)
+            # unknown names are client input: don't let them grow the table forever
+            if limit is None or (name not in self.tool_limits and len(self._tool_gates) >= MAX_TOOL_GATES):
+                return None
+            gate = self._tool_gates[name] = _Gate(f"tool:{name}", limit)
+        return gate
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        tool_gate = self._tool_gate(context.message.name)
+        gates = [gate for gate in (tool_gate, self.global_gate) if gate is not None]
+        if not gates:
+            return await call_next(context)
+        # one deadline for the whole admission, however many queues it passes
+        deadline = asyncio.get_running_loop().time() + min(gate.limit.timeout for gate in gates)
+        acquired = []
+        try:
+            for gate in gates:
+                await gate.acquire(deadline)
+                acquired.append(gate)
+            return await call_next(context)
+        finally:
+            for gate in reversed(acquired):
+                gate.release()
+
+    def stats(self) -> dict:
+        """Per-scope slots, queue depth and rejection counts."""
+        gates = list(self._tool_gates.values())
+        if self.global_gate is not None:
+            gates.insert(0, self.global_gate)
+        return {gate.scope: gate.stats() for gate in gates}
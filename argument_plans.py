@@ -0,0 +1,61 @@
+"""Per-tool argument plans compiled once per tool-set change.
+
+A plan holds what the call middleware needs to know about a tool's
+arguments: which keys the tool accepts (anything else, e.g. a
+`langfuse_trace_id` added by a tracing client, is stripped) and the tool's
+private / enabled flags. Type checks and coercion are left to the SDK's
+schema validation. Plans live in a plain dict keyed by tool name, so the
+hot path is one lookup instead of fetching the tool and walking its schema.
+"""
+
+from dataclasses import dataclass
+from typing import Any
+
+from fastmcp import FastMCP
+from fastmcp.tools import Tool
+
+import catalog_cache
+
+
+@dataclass(frozen=True)
+class ArgumentPlan:
+    name: str
+    allowed: frozenset[str]
+    private: bool = False
+    enabled: bool = True
+
+    def apply(self, arguments: dict[str, Any]) -> list[str]:
+        """Prune `arguments` in place; returns the stripped keys."""
+        stripped = [key for key in arguments if key not in self.allowed]
+        for key in stripped:
+            del arguments[key]
+        return stripped
+
+
+def compile_plan(tool: Tool) -> ArgumentPlan:
+    return ArgumentPlan(
+        name=tool.key,
+        allowed=frozenset(tool.parameters.get("properties", {})),
+        private="private" in tool.tags,
+        enabled=tool.enabled,
+    )
+
+
+class ArgumentPlans:
+    """Compiled plans for every tool of a server, rebuilt when tools change."""
+
+    def __init__(self, server: FastMCP):
+        self.server = server
+        self._plans: dict[str, ArgumentPlan] = {}
+        self._generation: int | None = None
+
+    async def get(self, name: str) -> ArgumentPlan | None:
+        if self._generation != catalog_cache.generation():
+            await self.rebuild()
+        return self._plans.get(name)
+
+    async def rebuild(self) -> None:
+        generation = catalog_cache.generation()
+        tools = await self.server.get_tools()
+        self._plans = {key: compile_plan(tool) for key, tool in tools.items()}
+        self._generation = generation
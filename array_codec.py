@@ -0,0 +1,66 @@
+"""Binary array payloads for MCP tools.
+
+Arrays travel as base64 of their raw little-endian buffer plus a dtype and
+shape header instead of JSON lists, so a million floats cost one base64
+decode and an `np.frombuffer` view rather than a million JSON numbers.
+
+    {"dtype": "<f8", "shape": [1000, 3], "data": "AAAAAAAA8D8..."}
+
+Clients use the same `encode_array` / `decode_array` pair.
+"""
+
+import base64
+import math
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+# refuse payloads that would allocate more than this many elements
+MAX_ELEMENTS = 50_000_000
+# bool, signed/unsigned int, float and complex, no object or string dtypes
+ALLOWED_KINDS = "biufc"
+
+
+class ArrayPayload(BaseModel):
+    """An n-dimensional array as a base64-encoded little-endian buffer."""
+
+    dtype: str = Field(description='numpy dtype string, e.g. "<f8" or "<i4"')
+    shape: list[int] = Field(description="array shape, [] for a scalar")
+    data: str = Field(description="base64 of the raw C-order buffer")
+
+
+def encode_array(array) -> ArrayPayload:
+    array = np.asarray(array)
+    if array.dtype.kind not in ALLOWED_KINDS:
+        raise ValueError(f"Unsupported dtype: {array.dtype}")
+    little = array.dtype.newbyteorder("<") if array.dtype.byteorder != "|" else array.dtype
+    array = array.astype(little, order="C", copy=False)
+    return ArrayPayload(
+        dtype=little.str,
+        shape=list(array.shape),
+        data=base64.b64encode(array.data).decode("ascii"),
+    )
+
+
+def decode_array(payload: ArrayPayload | dict) -> np.ndarray:
+    """Decode without copying the buffer; the returned array is read-only."""
+    if isinstance(payload, dict):
+        payload = ArrayPayload.model_validate(payload)
+    dtype = np.dtype(payload.dtype)
+    if dtype.kind not in ALLOWED_KINDS:
+        raise ValueError(f"Unsupported dtype: {payload.dtype}")
+    if dtype.byteorder not in "<|" and not (dtype.byteorder == "=" and np.little_endian):
+        raise ValueError(f"Array buffers must be little-endian, got {payload.dtype}")
+    if any(n < 0 for n in payload.shape):
+        raise ValueError(f"Invalid shape: {payload.shape}")
+    count = math.prod(payload.shape)
+    if count > MAX_ELEMENTS:
+        raise ValueError(f"Array too large: {count} elements (max {MAX_ELEMENTS})")
+
+    buffer = base64.b64decode(payload.data, validate=True)
+    if len(buffer) != count * dtype.itemsize:
+        raise ValueError(
+            f"Buffer holds {len(buffer)} bytes, shape {payload.shape} of {payload.dtype} "
+            f"needs {count * dtype.itemsize}"
+        )
+    return np.frombuffer(buffer, dtype=dtype).reshape(payload.shape)
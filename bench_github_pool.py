@@ -0,0 +1,197 @@
+"""Benchmark per-call vs pooled HTTP clients against a mock GitHub API.
+
+Starts a local mock of the GitHub endpoints github_server_auth uses
+(/user and /login/oauth/access_token) under uvicorn. It then fetches the
+profile `--calls` times at `--concurrency` through
+`SimpleGitHubOAuthProvider.http_client()`, in two modes:
+
+- fresh:  outside the server lifespan, a new client (and TCP connection)
+          per call, which is how the server used to work
+- pooled: inside `provider.connect()`, one keep-alive client shared by
+          all calls
+- etag:   pooled, through `provider.get_user()`, which revalidates its
+          cached profile with If-None-Match, so the mock answers 304
+
+Reports latency percentiles, throughput and, for the pooled client, how
+many requests opened a new connection vs reused one. The mock speaks plain
+HTTP, so the TLS handshake real GitHub calls also pay is not included;
+pooling saves more in production than it does here.
+
+    python bench_github_pool.py --calls 2000 --concurrency 16 --output bench_github_pool.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import socket
+import statistics
+import threading
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from github_server_auth import ServerSettings, SimpleGitHubOAuthProvider
+from http_pool import HTTP_CLIENT_REQUESTS
+
+MODES = ["fresh", "pooled", "etag"]
+
+PROFILE = {
+    "login": "octocat",
+    "id": 1,
+    "name": "The Octocat",
+    "avatar_url": "https://github.com/images/error/octocat_happy.gif",
+    "html_url": "https://github.com/octocat",
+    "public_repos": 8,
+    "followers": 20,
+}
+
+
+def mock_github_app(latency: float = 0.0, profile: dict | None = None) -> Starlette:
+    """Mock GitHub; /user sends ETag/Last-Modified and answers 304 to a matching If-None-Match.
+
+    `app.state.profile` can be replaced to simulate a changed profile;
+    `app.state.statuses` counts the /user responses by status code.
+    """
+    async def user(request: Request):
+        if not request.headers.get("authorization", "").startswith("Bearer "):
+            return JSONResponse({"message": "Requires authentication"}, status_code=401)
+        if latency:
+            await asyncio.sleep(latency)
+        body = json.dumps(app.state.profile).encode()
+        validators = {
+            "ETag": f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"',
+            "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT",
+            "Cache-Control": "private, max-age=60, s-maxage=60",
+        }
+        if request.headers.get("if-none-match") == validators["ETag"]:
+            status = 304
+            response = Response(status_code=304, headers=validators)
+        else:
+            status = 200
+            response = Response(body, media_type="application/json", headers=validators)
+        app.state.statuses[status] = app.state.statuses.get(status, 0) + 1
+        return response
+
+    async def access_token(request: Request):
+        return JSONResponse({"access_token": "gho_mock", "token_type": "bearer", "scope": "read:user"})
+
+    app = Starlette(routes=[
+        Route("/user", user, methods=["GET"]),
+        Route("/login/oauth/access_token", access_token, methods=["POST"]),
+    ])
+    app.state.profile = profile or PROFILE
+    app.state.statuses = {}
+    return app
+
+
+def start_mock(app: Starlette) -> tuple[str, uvicorn.Server]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}", server
+
+
+async def _fetch_all(provider: SimpleGitHubOAuthProvider, calls: int, concurrency: int,
+                     conditional: bool = False) -> list[float]:
+    url = f"{provider.settings.github_api_url}/user"
+    latencies = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with slots:
+            start = time.perf_counter()
+            if conditional:
+                await provider.get_user("gho_mock")
+            else:
+                async with provider.http_client() as client:
+                    response = await client.get(url, headers={"Authorization": "Bearer gho_mock"})
+                    response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return latencies
+
+
+def _reuse_counts() -> dict:
+    counts = {"new": 0, "reused": 0}
+    for (host, connection, version), child in HTTP_CLIENT_REQUESTS._children.items():
+        counts[connection] += int(child.value)
+    return counts
+
+
+async def run_mode(mode: str, settings: ServerSettings, calls: int, concurrency: int,
+                   mock: Starlette | None = None) -> dict:
+    provider = SimpleGitHubOAuthProvider(settings)
+    before = _reuse_counts()
+    if mock is not None:
+        mock.state.statuses.clear()
+    started = time.perf_counter()
+    if mode in ("pooled", "etag"):
+        async with provider.connect():
+            latencies = await _fetch_all(provider, calls, concurrency, conditional=mode == "etag")
+    else:
+        latencies = await _fetch_all(provider, calls, concurrency)
+    elapsed = time.perf_counter() - started
+    after = _reuse_counts()
+    latencies.sort()
+    result = {
+        "calls": calls,
+        "concurrency": concurrency,
+        "requests_per_s": calls / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+    if mode in ("pooled", "etag"):
+        result["connections_opened"] = after["new"] - before["new"]
+        result["requests_on_reused_connections"] = after["reused"] - before["reused"]
+    else:
+        result["connections_opened"] = calls
+    if mock is not None:
+        result["responses_200"] = mock.state.statuses.get(200, 0)
+        result["responses_304"] = mock.state.statuses.get(304, 0)
+    return result
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the mock waits before answering")
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--output", default="bench_github_pool.json")
+    args = parser.parse_args()
+
+    mock = mock_github_app(args.latency)
+    base_url, server = start_mock(mock)
+    settings = ServerSettings(
+        github_api_url=base_url,
+        github_token_url=f"{base_url}/login/oauth/access_token",
+        http_max_keepalive=args.concurrency,
+    )
+    results = {}
+    try:
+        for mode in args.modes:
+            # warm up imports and the mock before timing
+            await run_mode(mode, settings, min(50, args.calls), args.concurrency)
+            results[mode] = await run_mode(mode, settings, args.calls, args.concurrency, mock)
+            print(f"{mode:>6}: " + ", ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}"
+                                             for k, v in results[mode].items()))
+    finally:
+        server.should_exit = True
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""Benchmark per-request logging overhead: print() vs structured_log.
+
+Simulates the middleware hot path (on_message + on_request: four log lines
+per request) inside an asyncio loop and reports the time spent per request
+on the event loop, for each logging style and output sink:
+
+- devnull: output is discarded (best case for print)
+- slow:    a pipe drained by a slow reader, like a busy terminal or log
+           collector; print() blocks the loop once the pipe buffer fills
+
+    python bench_logging.py --requests 20000 --output bench_logging.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+
+import structured_log
+
+SINKS = ["devnull", "slow"]
+MODES = ["print", "structured"]
+
+
+def _open_sink(kind: str):
+    """A line-buffered text stream for `kind` and a function that closes it."""
+    if kind == "devnull":
+        stream = open(os.devnull, "w", buffering=1)
+        return stream, stream.close
+
+    read_fd, write_fd = os.pipe()
+    stop = threading.Event()
+
+    def drain():
+        with os.fdopen(read_fd, "rb", buffering=0) as pipe:
+            while pipe.read(4096):
+                if not stop.is_set():
+                    time.sleep(0.001)
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+    stream = os.fdopen(write_fd, "w", buffering=1)
+
+    def close():
+        stop.set()
+        stream.close()
+        reader.join()
+
+    return stream, close
+
+
+async def _print_requests(n: int, stream, latencies: list[float]) -> None:
+    method, source = "tools/call", "client"
+    for _ in range(n):
+        start = time.perf_counter()
+        print(f"Processing {method} from {source}", file=stream)
+        print(f"Request {method} completed in {0.42:.2f}ms", file=stream)
+        print(f"Completed {method}", file=stream)
+        print(f"Request {method} completed in {0.42:.2f}ms", file=stream)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0)
+
+
+async def _structured_requests(n: int, log: logging.Logger, latencies: list[float]) -> None:
+    method, source = "tools/call", "client"
+    for _ in range(n):
+        start = time.perf_counter()
+        log.info("Processing message", extra={"method": method, "source": source})
+        log.info("Request completed", extra={"method": method, "duration_ms": 0.42})
+        log.info("Completed message", extra={"method": method})
+        log.info("Request completed", extra={"method": method, "duration_ms": 0.42})
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0)
+
+
+def run(mode: str, sink: str, requests: int) -> dict:
+    stream, close = _open_sink(sink)
+    latencies: list[float] = []
+    dropped = 0
+    try:
+        if mode == "print":
+            asyncio.run(_print_requests(requests, stream, latencies))
+        else:
+            # rate limiting off: every line is distinct traffic in a real server
+            structured_log.configure(level=logging.INFO, sample_rates={}, burst=requests * 4, stream=stream)
+            asyncio.run(_structured_requests(requests, structured_log.get_logger("bench"), latencies))
+            structured_log.shutdown()
+            dropped = structured_log.dropped()
+    finally:
+        close()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "sink": sink,
+        "requests": requests,
+        "mean_us": statistics.fmean(latencies) * 1e6,
+        "p50_us": latencies[len(latencies) // 2] * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+        "max_us": latencies[-1] * 1e6,
+        "dropped": dropped,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--sink", choices=SINKS, action="append", help="default: all")
+    parser.add_argument("--output", default="bench_logging.json")
+    args = parser.parse_args()
+
+    results = [run(mode, sink, args.requests) for sink in args.sink or SINKS for mode in MODES]
+
+    print(f"{'sink':<8} {'mode':<11} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'max us':>10} {'dropped':>8}")
+    for r in results:
+        print(
+            f"{r['sink']:<8} {r['mode']:<11} {r['mean_us']:>9.2f} {r['p50_us']:>9.2f}"
+            f" {r['p99_us']:>9.2f} {r['max_us']:>10.1f} {r['dropped']:>8}"
+        )
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
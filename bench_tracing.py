@@ -0,0 +1,121 @@
+"""Benchmark what tracing adds to a tool call.
+
+Times a trivial tool function called directly and through `tracing.traced`
+with:
+
+- noexport: no exporter installed (the decorator's fast path)
+- fast:     a sink that accepts batches instantly
+- slow:     a sink that takes `--sink-latency` per batch, like a remote
+            backend; callers should not notice it
+- failing:  a sink that always raises, with spans spilled to a JSONL file
+
+and, with --langfuse (needs LANGFUSE_* credentials), `langfuse.observe`.
+Reports per-call overhead over the untraced call and the exporter's
+counters (exported / sampled out / dropped / spilled).
+
+    python bench_tracing.py --calls 20000 --output bench_tracing.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import tracing
+
+MODES = ["noexport", "fast", "slow", "failing"]
+
+
+def tool(x: int, langfuse_trace_id: str | None = None) -> int:
+    return x * 2
+
+
+class _Sink:
+    def __init__(self, latency: float = 0.0, fail: bool = False):
+        self.latency = latency
+        self.fail = fail
+
+    def export(self, spans) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail:
+            raise ConnectionError("backend unavailable")
+
+
+def _time_calls(func, calls: int) -> list[float]:
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        func(i)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _summary(latencies: list[float], baseline_us: float) -> dict:
+    latencies = sorted(latencies)
+    mean_us = statistics.fmean(latencies) * 1e6
+    return {
+        "mean_us": mean_us,
+        "overhead_us": mean_us - baseline_us,
+        "p50_us": latencies[len(latencies) // 2] * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+        "max_us": latencies[-1] * 1e6,
+    }
+
+
+def run(mode: str, calls: int, sink_latency: float, baseline_us: float, spill_dir: str) -> dict:
+    exporter = None
+    if mode != "noexport":
+        sink = _Sink(latency=sink_latency if mode == "slow" else 0.0, fail=mode == "failing")
+        spill_path = os.path.join(spill_dir, "spill.jsonl") if mode == "failing" else None
+        exporter = tracing.BatchSpanExporter(sink, spill_path=spill_path)
+    tracing.set_exporter(exporter)
+    try:
+        result = {"mode": mode, **_summary(_time_calls(tracing.traced(name="tool")(tool), calls), baseline_us)}
+    finally:
+        tracing.set_exporter(None)
+    if exporter is not None:
+        result.update(exporter.stats())
+    return result
+
+
+def run_langfuse(calls: int, baseline_us: float) -> dict:
+    from langfuse import get_client, observe
+
+    result = {"mode": "langfuse-observe", **_summary(_time_calls(observe(name="tool")(tool), calls), baseline_us)}
+    get_client().flush()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--sink-latency", type=float, default=0.05, help="seconds per batch for the slow sink")
+    parser.add_argument("--langfuse", action="store_true", help="also time langfuse.observe")
+    parser.add_argument("--output", default="bench_tracing.json")
+    args = parser.parse_args()
+
+    baseline = _summary(_time_calls(tool, args.calls), 0.0)
+    baseline["overhead_us"] = 0.0
+    results = [{"mode": "untraced", **baseline}]
+    with tempfile.TemporaryDirectory() as spill_dir:
+        for mode in MODES:
+            results.append(run(mode, args.calls, args.sink_latency, baseline["mean_us"], spill_dir))
+    if args.langfuse:
+        results.append(run_langfuse(args.calls, baseline["mean_us"]))
+
+    print(f"{'mode':<17} {'mean us':>8} {'+us':>7} {'p99 us':>8} {'max us':>9} "
+          f"{'exported':>9} {'sampled':>8} {'dropped':>8} {'spilled':>8}")
+    for r in results:
+        print(
+            f"{r['mode']:<17} {r['mean_us']:>8.2f} {r['overhead_us']:>7.2f} {r['p99_us']:>8.2f} {r['max_us']:>9.1f} "
+            f"{r.get('exported', '-'):>9} {r.get('sampled_out', '-'):>8} {r.get('dropped', '-'):>8} {r.get('spilled', '-'):>8}"
+        )
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Benchmark what each MCP transport costs for the same tools.
+
+Drives `tools/list` and `tools/call` at a fixed concurrency against
+math_server.py and weather_server.py over stdio, streamable-http and
+FastMCP's in-memory transport, then reports throughput, p50/p95/p99 latency
+and CPU time per call (client process and server process separately).
+Results are printed and written as JSON for regression tracking.
+
+Both benchmarked tools sit behind a cache (math_server's `add` is a cached
+tool, `get_weather` goes through the weather cache), so every `tools/call`
+gets arguments no earlier call used: `add(i, 5)` and `get_weather` for a
+different "lat,lon" per call. Each measured call is a cache miss that runs
+the tool, not a cache hit.
+
+    python bench_transports.py --calls 2000 --concurrency 16 --output bench_transports.json
+"""
+
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import logging
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+from fastmcp import Client
+from fastmcp.client.transports import StdioTransport
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# server module -> (tool, arguments for the i-th call); arguments never repeat
+# within a run, so the servers' result caches cannot answer the calls
+TARGETS = {
+    "math_server": ("add", lambda i: {"a": i, "b": 5}),
+    # 0.01 degree apart: the weather cache keys coordinates to two decimals
+    "weather_server": ("get_weather", lambda i: {"location": f"{-80 + (i % 16000) / 100:.2f},-74.00"}),
+}
+TRANSPORTS = ["inprocess", "stdio", "streamable-http"]
+OPERATIONS = ["tools/call", "tools/list"]
+
+
+# run a server module's `mcp` quietly on the given transport (and port)
+SERVER_SNIPPET = """
+import logging, {module} as m
+from fastmcp import FastMCP
+logging.getLogger().setLevel(logging.WARNING)
+if isinstance(m.mcp, FastMCP):
+    # fastmcp 2.x takes transport options as run() arguments
+    options = {{}} if {transport!r} == "stdio" else {{"port": {port}, "log_level": "warning"}}
+    m.mcp.run(transport={transport!r}, show_banner=False, **options)
+else:
+    # mcp SDK FastMCP reads them from its settings
+    m.mcp.settings.log_level = "WARNING"
+    m.mcp.settings.port = {port}
+    m.mcp.run(transport={transport!r})
+"""
+
+
+def _server_command(module: str, transport: str, port: int = 0) -> list[str]:
+    return [sys.executable, "-c", SERVER_SNIPPET.format(module=module, transport=transport, port=port)]
+
+
+def _children_cpu_seconds() -> float | None:
+    """user+system CPU of this process's live children, read from /proc."""
+    if not os.path.isdir("/proc"):
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    parent = os.getpid()
+    total = 0
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # the command name may contain spaces, fields restart after ")"
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent:
+            total += int(fields[11]) + int(fields[12])
+    return total / ticks
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise TimeoutError(f"server on port {port} did not come up")
+
+
+def _summarise(latencies: list[float], wall: float, client_cpu: float, server_cpu: float | None) -> dict:
+    calls = len(latencies)
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "calls": calls,
+        "throughput_per_s": calls / wall,
+        "latency_ms": {
+            "mean": statistics.fmean(latencies) * 1000,
+            "p50": cuts[49] * 1000,
+            "p95": cuts[94] * 1000,
+            "p99": cuts[98] * 1000,
+            "max": max(latencies) * 1000,
+        },
+        "client_cpu_us_per_call": client_cpu / calls * 1e6,
+        "server_cpu_us_per_call": server_cpu / calls * 1e6 if server_cpu is not None else None,
+    }
+
+
+async def _drive(client: Client, operation: str, tool: tuple[str, Callable[[int], dict]], calls: int,
+                 concurrency: int, in_process: bool) -> dict:
+    name, arguments = tool
+    call_index = itertools.count()
+
+    async def one() -> None:
+        if operation == "tools/call":
+            await client.call_tool(name, arguments(next(call_index)))
+        else:
+            await client.list_tools()
+
+    # warm up imports and connections before measuring
+    for _ in range(min(50, calls)):
+        await one()
+
+    latencies: list[float] = []
+    remaining = calls
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            await one()
+            latencies.append(time.perf_counter() - start)
+
+    server_before = None if in_process else _children_cpu_seconds()
+    cpu_before = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+    client_cpu = time.process_time() - cpu_before
+    server_cpu = None
+    if server_before is not None:
+        server_cpu = _children_cpu_seconds() - server_before
+    return _summarise(latencies, wall, client_cpu, server_cpu)
+
+
+async def bench_target(module: str, transport: str, calls: int, concurrency: int) -> list[dict]:
+    tool = TARGETS[module]
+    server = None
+    if transport == "inprocess":
+        client = Client(importlib.import_module(module).mcp)
+        # per-request INFO logging would dominate the numbers
+        logging.getLogger().setLevel(logging.WARNING)
+    elif transport == "stdio":
+        command = _server_command(module, "stdio")
+        client = Client(StdioTransport(command[0], command[1:], cwd=str(BASE_DIR)))
+    else:
+        port = _free_port()
+        server = subprocess.Popen(
+            _server_command(module, "streamable-http", port),
+            cwd=BASE_DIR,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        await _wait_for_port(port)
+        client = Client(f"http://127.0.0.1:{port}/mcp")
+
+    results = []
+    try:
+        async with client:
+            for operation in OPERATIONS:
+                summary = await _drive(client, operation, tool, calls, concurrency, transport == "inprocess")
+                results.append({"server": module, "transport": transport, "operation": operation, **summary})
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    return results
+
+
+def _print_table(results: list[dict]) -> None:
+    header = f"{'server':<16}{'transport':<17}{'operation':<12}{'calls/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'cli us':>9}{'srv us':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        lat = r["latency_ms"]
+        server_cpu = "-" if r["server_cpu_us_per_call"] is None else f"{r['server_cpu_us_per_call']:.0f}"
+        print(
+            f"{r['server']:<16}{r['transport']:<17}{r['operation']:<12}"
+            f"{r['throughput_per_s']:>10.0f}{lat['p50']:>9.2f}{lat['p95']:>9.2f}{lat['p99']:>9.2f}"
+            f"{r['client_cpu_us_per_call']:>9.0f}{server_cpu:>9}"
+        )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark MCP transports")
+    parser.add_argument("--calls", type=int, default=1000, help="measured calls per operation")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--servers", nargs="+", default=list(TARGETS), choices=list(TARGETS))
+    parser.add_argument("--transports", nargs="+", default=TRANSPORTS, choices=TRANSPORTS)
+    parser.add_argument("--output", default="bench_transports.json", help="JSON results file")
+    args = parser.parse_args()
+
+    results = []
+    for module in args.servers:
+        for transport in args.transports:
+            results.extend(await bench_target(module, transport, args.calls, args.concurrency))
+
+    _print_table(results)
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "calls": args.calls,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,6 +1,7 @@
 # basic import 
 from mcp.server.fastmcp import FastMCP
 import math
+from cpu_offload import cpu_bound
 
 # instantiate an MCP server client
 mcp = FastMCP("Hello World")
@@ -31,8 +32,9 @@ def divide(a: int, b: int) -> float:
     """Divide two numbers"""
     return float(a / b)
 
-# power tool
+# power tool, offloaded once the result grows past ~100k bits
 @mcp.tool()
+@cpu_bound(cost=lambda a, b: b * math.log2(abs(a) or 1), inline_below=100_000, timeout=10)
 def power(a: int, b: int) -> int:
     """Power of two numbers"""
     return int(a ** b)
@@ -49,8 +51,9 @@ def cbrt(a: int) -> float:
     """Cube root of a number"""
     return float(a ** (1/3))
 
-# factorial tool
+# factorial tool, offloaded for large inputs
 @mcp.tool()
+@cpu_bound(cost=lambda a: a, inline_below=20_000, timeout=10)
 def factorial(a: int) -> int:
     """factorial of a number"""
     return int(math.factorial(a))
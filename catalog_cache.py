@@ -0,0 +1,101 @@
+"""Precomputed, cached tool catalogs for tools/list filtering middleware.
+
+Listing middleware used to scan every tool's tags on every `tools/list`.
+`FilteredCatalog` keeps the filtered list (and its serialized `tools/list`
+JSON) per filter, so a listing is a dictionary lookup. Entries are dropped
+only when the tool set changes, which servers report by bumping a catalog
+generation. `CatalogFastMCP` does that from `add_tool`, `remove_tool`,
+`mount`, `enable_tool` and `disable_tool`:
+
+    mcp = CatalogFastMCP("Hello World")
+    await mcp.disable_tool("add")
+
+Plain `FastMCP` servers (and `Tool.enable()` / `Tool.disable()` called on a
+tool directly) report nothing; call `invalidate()` after changing their tools.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Hashable, Iterable
+
+from fastmcp import FastMCP
+from fastmcp.tools import Tool
+from mcp.types import ListToolsResult
+
+_generation = 0
+
+
+def generation() -> int:
+    """Changes whenever a tool is added, removed, mounted, enabled or disabled."""
+    return _generation
+
+
+def invalidate() -> None:
+    """Start a new generation: every cached catalog and tool plan is rebuilt."""
+    global _generation
+    _generation += 1
+
+
+class CatalogFastMCP(FastMCP):
+    """FastMCP that invalidates cached catalogs whenever its tool set changes."""
+
+    def add_tool(self, tool: Tool) -> Tool:
+        try:
+            return super().add_tool(tool)
+        finally:
+            invalidate()
+
+    def remove_tool(self, name: str) -> None:
+        try:
+            super().remove_tool(name)
+        finally:
+            invalidate()
+
+    def mount(self, *args, **kwargs) -> None:
+        try:
+            super().mount(*args, **kwargs)
+        finally:
+            invalidate()
+
+    async def enable_tool(self, key: str) -> None:
+        (await self.get_tool(key)).enable()
+        invalidate()
+
+    async def disable_tool(self, key: str) -> None:
+        (await self.get_tool(key)).disable()
+        invalidate()
+
+
+@dataclass
+class CatalogEntry:
+    tools: list[Tool]
+    _json: bytes | None = field(default=None, repr=False)
+
+    @property
+    def json(self) -> bytes:
+        """The serialized tools/list result, built on first use."""
+        if self._json is None:
+            result = ListToolsResult(tools=[tool.to_mcp_tool(name=tool.key) for tool in self.tools])
+            self._json = result.model_dump_json(by_alias=True, exclude_none=True).encode()
+        return self._json
+
+
+class FilteredCatalog:
+    """Filtered tool lists keyed by filter, valid for one catalog generation."""
+
+    def __init__(self):
+        self._entries: dict[Hashable, CatalogEntry] = {}
+        self._generation = generation()
+
+    def lookup(self, key: Hashable) -> CatalogEntry | None:
+        if self._generation != _generation:
+            self._entries.clear()
+            self._generation = _generation
+        return self._entries.get(key)
+
+    def store(self, key: Hashable, tools: Iterable[Tool], predicate: Callable[[Tool], bool]) -> CatalogEntry:
+        entry = CatalogEntry([tool for tool in tools if predicate(tool)])
+        self._entries[key] = entry
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -7,18 +7,16 @@ from langchain import hub
 # from langchain.prompts import PromptTemplate  # Removed
 from langchain.tools import Tool # Import Tool
 from langgraph.prebuilt import create_react_agent
+from mcp_supervisor import stdio_config
 
 async def main():
     try:
         print("Started...")
         client = MultiServerMCPClient(
             {
-                "math": {
-                    "command": "python",
-                    # REPLACE WITH THE FULL ABSOLUTE PATH
-                    "args": ["math_server.py"],
-                    "transport": "stdio",
-                },
+                # served warm by `python mcp_supervisor.py serve` when it is
+                # running, otherwise spawns `python math_server.py` directly
+                "math": stdio_config("math"),
                 "weather": {
                     # make sure you start your weather server on port 8000
                     "url": "http://localhost:8000/mcp",
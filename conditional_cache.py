@@ -0,0 +1,103 @@
+"""Conditional-request (ETag / Last-Modified) caching for JSON GET calls.
+
+APIs like GitHub's answer a request carrying `If-None-Match` /
+`If-Modified-Since` with an empty 304 when nothing changed. The 304 is
+smaller and faster than the full response, and for GitHub it does not
+count against the rate limit. `ConditionalCache` keeps the last body and
+validators per (credential, URL) and revalidates on every call:
+
+    cache = ConditionalCache(max_age=300)
+    profile = await cache.get_json(client, "https://api.github.com/user", token,
+                                   headers={"Authorization": f"Bearer {token}"})
+
+An entry is used for at most `max_age` seconds after its last full
+download. After that it is fetched unconditionally, whatever the server
+says. Credentials are stored only as hashes. Outcomes go to
+`http_conditional_cache_total{result}`: miss, not_modified, changed,
+expired.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+
+from metrics import REGISTRY
+
+CONDITIONAL_CACHE = REGISTRY.counter(
+    "http_conditional_cache_total", "Conditional GETs by outcome.", ["result"])
+
+
+@dataclass
+class _Entry:
+    body: Any
+    etag: str | None
+    last_modified: str | None
+    # when the body was last downloaded in full; the hard TTL counts from here
+    stored_at: float
+
+
+class ConditionalCache:
+    def __init__(self, max_age: float = 300.0, maxsize: int = 1024):
+        self.max_age = max_age
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    @staticmethod
+    def key(credential: str, url: str) -> str:
+        return hashlib.blake2b(f"{credential}\0{url}".encode(), digest_size=16).hexdigest()
+
+    def _get(self, key: str) -> tuple[_Entry | None, str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, "miss"
+        if time.monotonic() - entry.stored_at >= self.max_age:
+            del self._entries[key]
+            return None, "expired"
+        self._entries.move_to_end(key)
+        return entry, "hit"
+
+    def _put(self, key: str, response: httpx.Response, body: Any) -> None:
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if etag is None and last_modified is None:
+            # nothing to revalidate with
+            self._entries.pop(key, None)
+            return
+        self._entries[key] = _Entry(body, etag, last_modified, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get_json(self, client: httpx.AsyncClient, url: str, credential: str,
+                       headers: dict[str, str] | None = None, error: str = "HTTP error") -> Any:
+        """GET `url` as JSON, revalidating a cached copy; other statuses raise ValueError(error ...)."""
+        key = self.key(credential, url)
+        entry, state = self._get(key)
+        headers = dict(headers or {})
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        response = await client.get(url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            CONDITIONAL_CACHE.labels("not_modified").inc()
+            return entry.body
+        if response.status_code != 200:
+            raise ValueError(f"{error}: {response.status_code} - {response.text}")
+
+        body = response.json()
+        CONDITIONAL_CACHE.labels("changed" if entry is not None else state).inc()
+        self._put(key, response, body)
+        return body
+
+    def invalidate(self, credential: str, url: str) -> None:
+        self._entries.pop(self.key(credential, url), None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
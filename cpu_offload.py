@@ -0,0 +1,196 @@
+"""Run CPU-heavy synchronous tools in a bounded pool of worker processes.
+
+FastMCP runs sync tools directly on the event loop, so one slow call (say
+`factorial(200000)`) blocks every other request on the server. Decorating a
+tool with `cpu_bound` makes it async: cheap calls still run inline, expensive
+ones are shipped to a worker process with a timeout.
+
+    @mcp.tool()
+    @cpu_bound(cost=lambda a: a, inline_below=20_000, timeout=10)
+    def factorial(a: int) -> int:
+        return int(math.factorial(a))
+
+Each worker runs one call at a time, so a call that times out or is
+cancelled is stopped by killing just its own worker; calls running in the
+other workers are unaffected.
+"""
+
+import asyncio
+import atexit
+import functools
+import logging
+import multiprocessing
+import os
+import sys
+from multiprocessing.connection import Connection
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(conn: Connection) -> None:
+    """Worker process loop: run (fn, args, kwargs) messages until the pipe closes."""
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if message is None:
+            return
+        fn, args, kwargs = message
+        try:
+            reply = ("ok", fn(*args, **kwargs))
+        except Exception as e:
+            reply = ("error", e)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # unpicklable result or exception
+            conn.send(("error", RuntimeError(f"{fn.__name__} returned an unpicklable value: {e!r}")))
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def call(self, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        """Blocking; run in a thread. Raises RuntimeError if the worker dies."""
+        try:
+            self.conn.send((fn, args, kwargs))
+            status, value = self.conn.recv()
+        except (EOFError, OSError):
+            raise RuntimeError(f"CPU worker running {fn.__name__} exited unexpectedly") from None
+        if status == "error":
+            raise value
+        return value
+
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.conn.close()
+
+    def close(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.conn.close()
+
+
+class CPUPool:
+    """Lazily started worker processes with a bound on in-flight calls."""
+
+    def __init__(self, max_workers: int | None = None, max_pending: int | None = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # calls allowed to be running or queued in the pool at once
+        self.max_pending = max_pending or self.max_workers * 4
+        # spawn, not fork: the server process has an event loop and threads
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: list[_Worker] = []
+        self._busy: set[_Worker] = set()
+        self._pending: asyncio.Semaphore | None = None
+        self._running: asyncio.Semaphore | None = None
+
+    def _checkout(self) -> _Worker:
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.alive():
+                return worker
+            worker.kill()
+        return _Worker(self._context)
+
+    async def run(self, fn: Callable[..., Any], *args, timeout: float | None = None, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` in a worker process and await the result.
+
+        On timeout or cancellation a queued call is simply dropped; a call that
+        is already running cannot be interrupted, so its worker is killed and
+        replaced on next use.
+        """
+        if self._pending is None:
+            self._pending = asyncio.Semaphore(self.max_pending)
+            self._running = asyncio.Semaphore(self.max_workers)
+
+        async with asyncio.timeout(timeout):
+            async with self._pending, self._running:
+                worker = self._checkout()
+                self._busy.add(worker)
+                try:
+                    result = await asyncio.to_thread(worker.call, fn, args, kwargs)
+                except asyncio.CancelledError:
+                    logger.warning("Killing CPU worker running %s", fn.__name__)
+                    self._busy.discard(worker)
+                    worker.kill()
+                    raise
+                except BaseException:
+                    self._release(worker)
+                    raise
+                self._release(worker)
+                return result
+
+    def _release(self, worker: _Worker) -> None:
+        self._busy.discard(worker)
+        if worker.alive():
+            self._idle.append(worker)
+        else:
+            worker.kill()
+
+    def shutdown(self) -> None:
+        for worker in self._idle:
+            worker.close()
+        for worker in self._busy:
+            worker.kill()
+        self._idle.clear()
+        self._busy.clear()
+
+
+default_pool = CPUPool()
+atexit.register(default_pool.shutdown)
+
+
+def _export_kernel(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Make the undecorated function picklable by reference.
+
+    Pickle looks functions up by module and qualified name, but after
+    decoration that name points at the async wrapper. Publish the original
+    under a private module attribute instead. Worker processes re-import the
+    module, run the decorator again and so find the same attribute.
+    """
+    name = f"_cpu_kernel_{fn.__name__}"
+    setattr(sys.modules[fn.__module__], name, fn)
+    fn.__qualname__ = name
+    return fn
+
+
+def cpu_bound(
+    cost: Callable[..., float] | None = None,
+    inline_below: float = 0,
+    timeout: float | None = 30.0,
+    pool: CPUPool | None = None,
+):
+    """Mark a sync tool as CPU-bound so it runs in a worker process.
+
+    `cost` receives the tool arguments and returns an estimated cost; calls
+    estimated below `inline_below` run inline, where a process hop would cost
+    more than the work itself. Without `cost` every call is offloaded.
+    Offloaded calls taking longer than `timeout` seconds raise TimeoutError.
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if cost is not None and cost(*args, **kwargs) < inline_below:
+                return fn(*args, **kwargs)
+            try:
+                return await (pool or default_pool).run(kernel, *args, timeout=timeout, **kwargs)
+            except TimeoutError:
+                raise TimeoutError(f"{fn.__name__} did not finish within {timeout}s") from None
+
+        kernel = _export_kernel(fn)
+        return wrapper
+
+    return decorator
@@ -1,8 +1,11 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import uvicorn
 import time
 
+from metrics import HTTP_DURATION, HTTPMetricsMiddleware, metrics_response, route_label
+from rate_limit import Policy, build_rate_limiter
+
 app = FastAPI()
 
 bearer_scheme = HTTPBearer()
@@ -13,7 +16,13 @@ fake_tokens_db = {
     "user-token-456": {"user_id": 2, "role": "user"},
 }
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
+# Per-token request budgets by role
+rate_limiter = build_rate_limiter(
+    policies={"admin": Policy(rate=20, burst=40), "user": Policy(rate=5, burst=10)},
+    default=Policy(rate=2, burst=5),
+)
+
+async def get_current_user(response: Response, credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
     token = credentials.credentials
     user_data = fake_tokens_db.get(token)
     if not user_data:
@@ -21,16 +30,33 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or missing token",
         )
+    limit = await rate_limiter.check(token, user_data["role"])
+    if not limit.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers=limit.headers(),
+        )
+    response.headers.update(limit.headers())
     return user_data
 
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
+    path = route_label(request.scope)
     start_time = time.perf_counter()
     response = await call_next(request)
     process_time = time.perf_counter() - start_time
     response.headers["X-Process-Time"] = str(process_time)
+    HTTP_DURATION.labels(request.method, path, response.status_code).observe(process_time)
     return response
 
+# payload sizes and in-flight requests (outermost, so it sees the final bodies)
+app.add_middleware(HTTPMetricsMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return metrics_response()
+
 @app.get("/")
 def secure_data(current_user: dict = Depends(get_current_user)):
     return {
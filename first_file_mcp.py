@@ -1,16 +1,28 @@
 from fastmcp import FastMCP, Context
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response
 from fastmcp.server.dependencies import get_context
 from fastmcp.server.middleware import Middleware, MiddlewareContext
-from fastmcp.server.dependencies import get_http_headers
 from fastmcp.exceptions import ToolError
 import time
-from langfuse import observe
 from langfuse import Langfuse
 from fastmcp.tools import Tool
 from fastmcp.tools.tool_transform import forward, ArgTransform
-from functools import wraps
+from functools import cache, wraps
+import os
+import tempfile
+from catalog_cache import CatalogFastMCP, FilteredCatalog
+from argument_plans import ArgumentPlans
+from structured_log import get_logger
+from metrics import HTTPMetricsMiddleware, MCPMetricsMiddleware, metrics_response
+from tracing import BatchSpanExporter, LangfuseSink, set_exporter, traced
+from loop_monitor import LoopMonitorMiddleware, debug_loop_route
+from admission import AdmissionControlMiddleware, Limit
+from jobs import JobManager
+import launcher
+from starlette.middleware import Middleware as ASGIMiddleware
+
+log = get_logger("first_file_mcp")
 
 
 langfuse = Langfuse(
@@ -18,9 +30,18 @@ langfuse = Langfuse(
   public_key="pk-lf-ca4bf373-d6d1-4c99-9133-cedbe6ff9d5d",
   host="https://us.cloud.langfuse.com"
 )
+# spans from @traced functions go to Langfuse in batches, off the request path;
+# whatever the queue can't hold (or Langfuse rejects) lands in the spill file,
+# outside the source tree unless MCP_TRACE_SPILL says otherwise
+set_exporter(BatchSpanExporter(
+    LangfuseSink(langfuse),
+    spill_path=os.environ.get("MCP_TRACE_SPILL", os.path.join(tempfile.gettempdir(), "mcp_traces_spill.jsonl")),
+    spill_max_bytes=int(os.environ.get("MCP_TRACE_SPILL_MAX_BYTES", 64 * 1024 * 1024)),
+))
 
 # Create a basic server instance
-first_mcp = FastMCP(name="MyAssistantServer",mask_error_details=True)
+# reports tool changes, so the cached listing and argument plans stay current
+first_mcp = CatalogFastMCP(name="MyAssistantServer",mask_error_details=True)
 
 class UserAuthMiddleware(Middleware):
     async def on_call_tool(self, context: MiddlewareContext, call_next):
@@ -35,6 +56,14 @@ class UserAuthMiddleware(Middleware):
 async def health_check(request: Request):
     return JSONResponse({"status": "healthy"})
 
+@first_mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_route(request: Request):
+    """Prometheus metrics: per-method and per-tool latency, in-flight, errors, payload sizes."""
+    return metrics_response()
+
+# event loop lag and recent stalls, attributed to the tool/method that was running
+first_mcp.custom_route("/debug/loop", methods=["GET"])(debug_loop_route)
+
 @first_mcp.tool()
 async def add(a: int, b:int=0) -> int:
     """Adds two integer numbers together."""
@@ -64,6 +93,34 @@ async def my_tool(ctx: Context) -> str:
         return "Cancelled!"
 
 
+# long conversions run as jobs: the call returns a job id, the work runs in the
+# background and the result is kept for an hour (in SQLite too if MCP_JOB_DB is set)
+job_db = os.environ.get("MCP_JOB_DB")
+if job_db is None and launcher.worker_count() > 1:
+    # polls land on any worker, so job state must live in a shared store
+    raise RuntimeError("MCP_JOB_DB must be set when running in more than one worker")
+jobs = JobManager(workers=2, max_queued=16, ttl=3600, store_path=job_db)
+jobs.register(first_mcp)
+
+
+@cache
+def document_converter():
+    # docling is heavy to import and loads models on first use: do it once, lazily
+    from docling.document_converter import DocumentConverter
+
+    return DocumentConverter()
+
+
+@first_mcp.tool()
+@jobs.job_tool
+def convert_document(source: str) -> str:
+    """Convert a PDF or DOCX (path or URL) to Markdown with docling.
+
+    Returns a job id at once; poll job_status and fetch the Markdown with job_result.
+    """
+    return document_converter().convert(source).document.export_to_markdown()
+
+
 from fastmcp import FastMCP
 
 class ComponentProvider:
@@ -75,11 +132,9 @@ class ComponentProvider:
     def dec(func):
 
         @wraps(func)
-        @observe(name=func.__name__)
+        @traced(name=func.__name__)
         def inner(*args, **kwargs):
-            print('decorated function')
-            print(args)
-            print(kwargs)
+            log.debug("Calling decorated function", extra={"function": func.__name__, "call_args": args, "call_kwargs": kwargs})
             return func(*args, **kwargs)
         return inner
     
@@ -111,20 +166,26 @@ provider = ComponentProvider(first_mcp)
 
 
 
+def is_public(tool) -> bool:
+    return tool.enabled and "private" not in tool.tags
+
+
 class ListingFilterMiddleware(Middleware):
 
+    def __init__(self, server: FastMCP):
+        # filtered tools/list, recomputed only when tools change
+        self.catalog = FilteredCatalog()
+        # per-tool argument plans, keyed by the names this server knows its
+        # tools by (also when it is mounted under a prefix)
+        self.argument_plans = ArgumentPlans(server)
+
     # @observe()
     async def on_list_tools(self, context: MiddlewareContext, call_next):
-        result = await call_next(context)
-        
         # Filter out tools with "private" tag
-        filtered_tools = [
-            tool for tool in result 
-            if "private" not in tool.tags
-        ]
-        
-        # Return modified list
-        return filtered_tools
+        entry = self.catalog.lookup("public")
+        if entry is None:
+            entry = self.catalog.store("public", await call_next(context), is_public)
+        return entry.tools
 
     # @observe()
     async def on_request(self, context: MiddlewareContext, call_next):
@@ -133,54 +194,73 @@ class ListingFilterMiddleware(Middleware):
         try:
             result = await call_next(context)
             duration_ms = (time.perf_counter() - start_time) * 1000
-            print(f"Request {context.method} completed in {duration_ms:.2f}ms")
+            log.info("Request completed", extra={"method": context.method, "duration_ms": round(duration_ms, 2)})
             return result
         except Exception as e:
             duration_ms = (time.perf_counter() - start_time) * 1000
-            print(f"Request {context.method} failed after {duration_ms:.2f}ms: {e}")
+            log.warning(
+                "Request failed",
+                extra={"method": context.method, "duration_ms": round(duration_ms, 2), "error": repr(e)},
+            )
             raise
 
     # @observe()
     async def on_message(self, context: MiddlewareContext, call_next):
         """Called for all MCP messages."""
-        print(f"Processing {context.method} from {context.source}")
+        log.debug("Processing message", extra={"method": context.method, "source": context.source})
         
         result = await call_next(context)
         
-        print(f"Completed {context.method}")
+        log.debug("Completed message", extra={"method": context.method})
         return result
 
     # @observe()
     async def on_call_tool(self, context: MiddlewareContext, call_next):
-        # Access the tool object to check its metadata
-        if context.fastmcp_context:
-            try:
-                tool = await context.fastmcp_context.fastmcp.get_tool(context.message.name)
-                
-                # permissions = context.get_state("permissions")
-                removed = [context.message.arguments.pop(x) for x in (context.message.arguments.keys() - tool.parameters['properties'].keys())]
-                # Check if this tool has a "private" tag
-                if "private" in tool.tags:
-                    raise ToolError("Access denied: private tool")
-                    
-                # Check if tool is enabled
-                if not tool.enabled:
-                    raise ToolError("Tool is currently disabled")
-                    
-            except Exception as e:
-                # Tool not found or other error - let execution continue
-                # and handle the error naturally
-                print(e)
-                pass
+        # Precompiled per-tool plan instead of fetching the tool and walking its schema
+        plan = await self.argument_plans.get(context.message.name)
+        # Unknown tools fall through and fail naturally in the tool manager
+        if plan is not None:
+            # Check if this tool has a "private" tag
+            if plan.private:
+                raise ToolError("Access denied: private tool")
+
+            # Check if tool is enabled
+            if not plan.enabled:
+                raise ToolError("Tool is currently disabled")
+
+            # Strip arguments the tool does not take (e.g. langfuse_trace_id)
+            if context.message.arguments is not None:
+                plan.apply(context.message.arguments)
 
         # @observe()
         x = await call_next(context)
         return x
 
 
-first_mcp.add_middleware(ListingFilterMiddleware())
+# outermost, so calls rejected by the filter are timed and counted too
+first_mcp.add_middleware(MCPMetricsMiddleware())
+first_mcp.add_middleware(LoopMonitorMiddleware())
+listing_filter = ListingFilterMiddleware(first_mcp)
+first_mcp.add_middleware(listing_filter)
+# after the filter, so denied calls never take a slot; saturated tools shed load
+# with a retryable error instead of queueing without bound
+admission = AdmissionControlMiddleware(default_tool_limit=Limit(concurrency=16, queue=32, timeout=1.0))
+first_mcp.add_middleware(admission)
+
+@first_mcp.custom_route("/tools", methods=["GET"])
+async def list_public_tools(request: Request):
+    """The public tools/list result as JSON, served from the catalog cache."""
+    entry = listing_filter.catalog.lookup("public")
+    if entry is None:
+        entry = listing_filter.catalog.store("public", (await first_mcp.get_tools()).values(), is_public)
+    return Response(entry.json, media_type="application/json")
 # Create ASGI app with middleware
-first_mcp_app = first_mcp.http_app(path="/mcp",stateless_http=True, transport="streamable-http")
+first_mcp_app = first_mcp.http_app(
+    path="/mcp",
+    stateless_http=True,
+    transport="streamable-http",
+    middleware=[ASGIMiddleware(HTTPMetricsMiddleware)],
+)
 
 
 
@@ -0,0 +1,53 @@
+"""A single MCP endpoint in front of several FastMCP servers.
+
+Each server is mounted in-process under a namespace prefix (`first_add`,
+`sec_mul`, ...), so a client needs one session and one handshake instead of
+one per server, and `tools/call` is dispatched straight to the owning
+FastMCP instance (its own middleware included) without another HTTP hop.
+The merged `tools/list` is served from a cache until the tool set changes.
+"""
+
+from fastmcp import FastMCP
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+
+from catalog_cache import CatalogFastMCP, FilteredCatalog
+
+
+class CatalogCacheMiddleware(Middleware):
+    """Serve tools/list from a cached merged listing.
+
+    The cache is dropped whenever a tool is added, removed, enabled or
+    disabled on a `CatalogFastMCP` server (see catalog_cache). FastMCP runs
+    middleware in the order it was added, so the mounted servers' own
+    middleware and any middleware added to the gateway after this one run
+    inside it: their listing is cached and served to every caller. Per-user
+    filtering has to run before this middleware, e.g.
+    `gateway.middleware.insert(0, ...)`, so it filters the cached listing.
+    """
+
+    def __init__(self):
+        self.catalog = FilteredCatalog()
+
+    async def on_list_tools(self, context: MiddlewareContext, call_next):
+        entry = self.catalog.lookup("all")
+        if entry is None:
+            entry = self.catalog.store("all", await call_next(context), lambda tool: True)
+        return entry.tools
+
+    def invalidate(self) -> None:
+        """Drop the cached catalog."""
+        self.catalog.clear()
+
+
+def build_gateway(servers: dict[str, FastMCP], name: str = "Gateway") -> FastMCP:
+    """Mount each server under its prefix on a new FastMCP gateway.
+
+    Changes to the mounted servers' tools only reach the cached listing if
+    they are `CatalogFastMCP` servers.
+    """
+    gateway = CatalogFastMCP(name=name)
+    for prefix, server in servers.items():
+        gateway.mount(server, prefix=prefix)
+    gateway.catalog_cache = CatalogCacheMiddleware()
+    gateway.add_middleware(gateway.catalog_cache)
+    return gateway
@@ -3,11 +3,16 @@
 import logging
 import secrets
 import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Any, Literal
 
 import click
+import httpx
+import uvicorn
 from pydantic import AnyHttpUrl
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from starlette.applications import Starlette
 from starlette.exceptions import HTTPException
 from starlette.requests import Request
 from starlette.responses import JSONResponse, RedirectResponse, Response
@@ -22,9 +27,17 @@ from mcp.server.auth.provider import (
     construct_redirect_uri,
 )
 from mcp.server.auth.settings import AuthSettings, ClientRegistrationOptions
-from mcp.server.fastmcp.server import FastMCP
+from mcp.server.fastmcp.server import Context, FastMCP
 from mcp.shared._httpx_utils import create_mcp_http_client
 from mcp.shared.auth import OAuthClientInformationFull, OAuthToken
+from mcp.types import ToolAnnotations
+
+from conditional_cache import ConditionalCache
+from http_pool import pooled_client
+from metrics import metrics_response
+from rate_limit import token_key
+from singleflight import SingleFlight
+from streaming import Progress, Result, streaming_tool
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +60,20 @@ class ServerSettings(BaseSettings):
     # GitHub OAuth URLs
     github_auth_url: str = "https://github.com/login/oauth/authorize"
     github_token_url: str = "https://github.com/login/oauth/access_token"
+    github_api_url: str = "https://api.github.com"
+
+    # Outbound HTTP pool shared by the OAuth callback and the tools
+    http_max_connections: int = 100
+    http_max_keepalive: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_timeout: float = 10.0
+    http_connect_timeout: float = 5.0
+    # used only when the optional h2 package is installed
+    http2: bool = True
+    # Profile responses are revalidated with ETag/Last-Modified; this caps how
+    # long a cached body may be reused without a full download
+    profile_cache_ttl: float = 300.0
+    profile_cache_size: int = 1024
 
     mcp_scope: str = "user"
     github_scope: str = "read:user"
@@ -73,6 +100,49 @@ class SimpleGitHubOAuthProvider(OAuthAuthorizationServerProvider):
         # Store GitHub tokens with MCP tokens using the format:
         # {"mcp_token": "github_token"}
         self.token_mapping: dict[str, str] = {}
+        # Pooled client to GitHub, open while the server runs (see connect())
+        self.http: httpx.AsyncClient | None = None
+        self.profile_cache = ConditionalCache(settings.profile_cache_ttl, settings.profile_cache_size)
+
+    @asynccontextmanager
+    async def connect(self):
+        """Hold one keep-alive client to GitHub for the server's lifetime."""
+        async with pooled_client(
+            max_connections=self.settings.http_max_connections,
+            max_keepalive=self.settings.http_max_keepalive,
+            keepalive_expiry=self.settings.http_keepalive_expiry,
+            timeout=self.settings.http_timeout,
+            connect_timeout=self.settings.http_connect_timeout,
+            http2=self.settings.http2,
+        ) as client:
+            self.http = client
+            try:
+                yield client
+            finally:
+                self.http = None
+
+    @asynccontextmanager
+    async def http_client(self):
+        """The pooled client, or a one-off client when used outside the server lifespan."""
+        if self.http is not None:
+            yield self.http
+        else:
+            async with create_mcp_http_client() as client:
+                yield client
+
+    async def get_user(self, github_token: str) -> dict[str, Any]:
+        """The GitHub user for a token, revalidated against the cached copy."""
+        async with self.http_client() as client:
+            return await self.profile_cache.get_json(
+                client,
+                f"{self.settings.github_api_url}/user",
+                github_token,
+                headers={
+                    "Authorization": f"Bearer {github_token}",
+                    "Accept": "application/vnd.github.v3+json",
+                },
+                error="GitHub API error",
+            )
 
     async def get_client(self, client_id: str) -> OAuthClientInformationFull | None:
         """Get OAuth client information."""
@@ -123,7 +193,7 @@ class SimpleGitHubOAuthProvider(OAuthAuthorizationServerProvider):
         client_id = state_data["client_id"]
 
         # Exchange code for token with GitHub
-        async with create_mcp_http_client() as client:
+        async with self.http_client() as client:
             response = await client.post(
                 self.settings.github_token_url,
                 data={
@@ -255,9 +325,11 @@ class SimpleGitHubOAuthProvider(OAuthAuthorizationServerProvider):
             del self.tokens[token]
 
 
-def create_simple_mcp_server(settings: ServerSettings) -> FastMCP:
+def create_simple_mcp_server(
+    settings: ServerSettings, oauth_provider: SimpleGitHubOAuthProvider | None = None
+) -> FastMCP:
     """Create a simple FastMCP server with GitHub OAuth."""
-    oauth_provider = SimpleGitHubOAuthProvider(settings)
+    oauth_provider = oauth_provider or SimpleGitHubOAuthProvider(settings)
 
     auth_settings = AuthSettings(
         issuer_url=settings.server_url,
@@ -303,6 +375,11 @@ def create_simple_mcp_server(settings: ServerSettings) -> FastMCP:
                 },
             )
 
+    @app.custom_route("/metrics", methods=["GET"])
+    async def metrics_route(request: Request) -> Response:
+        """Prometheus metrics, including outbound connection reuse to GitHub."""
+        return metrics_response()
+
     def get_github_token() -> str:
         """Get the GitHub token for the authenticated user."""
         access_token = get_access_token()
@@ -317,30 +394,52 @@ def create_simple_mcp_server(settings: ServerSettings) -> FastMCP:
 
         return github_token
 
-    @app.tool()
-    async def get_user_profile() -> dict[str, Any]:
+    profile_flights = SingleFlight("get_user_profile")
+
+    @app.tool(annotations=ToolAnnotations(readOnlyHint=True, idempotentHint=True))
+    @streaming_tool(returns=dict[str, Any])
+    async def get_user_profile(ctx: Context) -> AsyncIterator[Any]:
         """Get the authenticated user's GitHub profile information.
 
         This is the only tool in our simple example. It requires the 'user' scope.
+        Progress and the core profile fields are streamed while the full
+        profile is fetched.
         """
+        yield Progress(0, 2, "Resolving GitHub token")
         github_token = get_github_token()
 
-        async with create_mcp_http_client() as client:
-            response = await client.get(
-                "https://api.github.com/user",
-                headers={
-                    "Authorization": f"Bearer {github_token}",
-                    "Accept": "application/vnd.github.v3+json",
-                },
-            )
+        yield Progress(1, 2, "Fetching profile from GitHub")
+        # concurrent calls with the same token share one GitHub request
+        profile = await profile_flights.do(
+            token_key(github_token, "github"), lambda: oauth_provider.get_user(github_token)
+        )
 
-            if response.status_code != 200:
-                raise ValueError(
-                    f"GitHub API error: {response.status_code} - {response.text}"
-                )
+        # the fields clients show first, ahead of the full result
+        yield {key: profile.get(key) for key in ("login", "name", "avatar_url", "html_url")}
+        yield Progress(2, 2, "Done")
+        yield Result(profile)
+
+    return app
 
-            return response.json()
 
+def create_app(
+    settings: ServerSettings, transport: Literal["sse", "streamable-http"]
+) -> Starlette:
+    """The server's ASGI app; its lifespan owns the pooled GitHub client."""
+    oauth_provider = SimpleGitHubOAuthProvider(settings)
+    mcp_server = create_simple_mcp_server(settings, oauth_provider)
+    if transport == "streamable-http":
+        app = mcp_server.streamable_http_app()
+    else:
+        app = mcp_server.sse_app()
+    transport_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        async with oauth_provider.connect(), transport_lifespan(app):
+            yield
+
+    app.router.lifespan_context = lifespan
     return app
 
 
@@ -369,9 +468,9 @@ def main(port: int, host: str, transport: Literal["sse", "streamable-http"]) ->
         logger.error(f"Error: {e}")
         return 1
 
-    mcp_server = create_simple_mcp_server(settings)
+    app = create_app(settings, transport)
     logger.info(f"Starting server with {transport} transport")
-    mcp_server.run(transport=transport)
+    uvicorn.run(app, host=settings.host, port=settings.port, log_level="info")
     return 0
 
 
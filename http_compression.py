@@ -0,0 +1,245 @@
+"""Negotiated response compression (zstd, br, gzip) for the MCP HTTP apps.
+
+`CompressionMiddleware` is plain ASGI. It picks an encoding from the
+client's Accept-Encoding (q-values respected; on ties the server prefers
+zstd, then br, then gzip). brotli and zstd need the optional `brotli` and
+`zstandard` packages and are offered only when installed.
+
+- JSON and other compressible bodies smaller than `minimum_size` are sent
+  as is, and so is any response marked `Cache-Control: no-transform`.
+- Server-sent events (the streamable-http transport) are compressed as a
+  stream. Each chunk is flushed right away, so events are never held back
+  waiting for more data.
+- Complete bodies are compressed once per distinct content. The result is
+  kept in an LRU keyed by (encoding, hash of body), bounded by the total
+  size of the compressed bodies (`cache_bytes`), so repeated static
+  payloads such as the tool catalog are served precompressed.
+"""
+
+import hashlib
+import zlib
+from collections import OrderedDict
+
+from metrics import REGISTRY
+
+COMPRESSED_RESPONSES = REGISTRY.counter(
+    "http_compressed_responses_total", "Responses sent compressed, by encoding and mode.", ["encoding", "mode"])
+COMPRESSION_CACHE = REGISTRY.counter(
+    "http_compression_cache_total", "Precompressed body cache lookups.", ["result"])
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+
+
+class _Gzip:
+    name = "gzip"
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        c = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return c.compress(data) + c.flush()
+
+    def stream(self):
+        c = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return c.compress, lambda: c.flush(zlib.Z_SYNC_FLUSH), c.flush
+
+
+class _Brotli:
+    name = "br"
+
+    def __init__(self, quality: int = 4):
+        import brotli
+
+        self.brotli = brotli
+        self.quality = quality
+
+    def compress(self, data: bytes) -> bytes:
+        return self.brotli.compress(data, quality=self.quality)
+
+    def stream(self):
+        c = self.brotli.Compressor(quality=self.quality)
+        return c.process, c.flush, c.finish
+
+
+class _Zstd:
+    name = "zstd"
+
+    def __init__(self, level: int = 3):
+        import zstandard
+
+        self.zstd = zstandard
+        self.compressor = zstandard.ZstdCompressor(level=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def stream(self):
+        c = self.compressor.compressobj()
+        return c.compress, lambda: c.flush(self.zstd.COMPRESSOBJ_FLUSH_BLOCK), c.flush
+
+
+def available_encoders(gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3) -> list:
+    """Encoders in server preference order, skipping ones whose package is missing."""
+    encoders = []
+    for factory, arg in ((_Zstd, zstd_level), (_Brotli, brotli_quality)):
+        try:
+            encoders.append(factory(arg))
+        except ImportError:
+            pass
+    encoders.append(_Gzip(gzip_level))
+    return encoders
+
+
+def _accepted(header: str) -> dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def negotiate(header: str, encoders: list):
+    """The best encoder for an Accept-Encoding header, or None."""
+    accepted = _accepted(header)
+    best, best_q = None, 0.0
+    for encoder in encoders:
+        q = accepted.get(encoder.name, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoder, q
+    return best
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, cache_bytes: int = 16 * 1024 * 1024,
+                 max_cached_body: int = 4 * 1024 * 1024, **levels):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache_bytes = cache_bytes
+        self.max_cached_body = max_cached_body
+        self.encoders = available_encoders(**levels)
+        # (encoding, body hash) -> compressed body
+        self._cache: OrderedDict[tuple[str, bytes], bytes] = OrderedDict()
+        self._cached_bytes = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoder = negotiate(accept, self.encoders) if accept else None
+        if encoder is None:
+            return await self.app(scope, receive, send)
+        await self.app(scope, receive, _Responder(self, encoder, send))
+
+    def compress_cached(self, encoder, body: bytes) -> bytes:
+        if len(body) > self.max_cached_body:
+            return encoder.compress(body)
+        key = (encoder.name, hashlib.blake2b(body, digest_size=16).digest())
+        compressed = self._cache.get(key)
+        if compressed is not None:
+            self._cache.move_to_end(key)
+            COMPRESSION_CACHE.labels("hit").inc()
+            return compressed
+        COMPRESSION_CACHE.labels("miss").inc()
+        compressed = encoder.compress(body)
+        if len(compressed) > self.cache_bytes:
+            return compressed
+        self._cache[key] = compressed
+        self._cached_bytes += len(compressed)
+        while self._cached_bytes > self.cache_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cached_bytes -= len(evicted)
+        return compressed
+
+
+class _Responder:
+    """Wraps `send` for one response: decides whether and how to compress."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoder, send):
+        self.middleware = middleware
+        self.encoder = encoder
+        self.send = send
+        self.start = None
+        # None until decided, then "identity", "buffer" or "stream"
+        self.mode = None
+        self.buffer = bytearray()
+        self.stream = None
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = {name.lower(): value for name, value in message.get("headers", [])}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            cache_control = headers.get(b"cache-control", b"").lower()
+            if (b"content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or b"no-transform" in cache_control):
+                self.mode = "identity"
+            elif content_type.startswith("text/event-stream"):
+                await self._begin_stream()
+            return
+        if message["type"] != "http.response.body":
+            return await self.send(message)
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+        if self.mode == "identity":
+            if self.start is not None:
+                await self.send(self.start)
+                self.start = None
+            return await self.send(message)
+        if self.mode == "stream":
+            return await self._send_chunk(body, more)
+
+        self.buffer += body
+        if not more:
+            # whole body known: small bodies go out as is, others via the cache
+            data = bytes(self.buffer)
+            if len(data) < self.middleware.minimum_size:
+                await self.send(self.start)
+                return await self.send({"type": "http.response.body", "body": data})
+            compressed = self.middleware.compress_cached(self.encoder, data)
+            COMPRESSED_RESPONSES.labels(self.encoder.name, "buffered").inc()
+            await self.send(self._compressed_start(len(compressed)))
+            return await self.send({"type": "http.response.body", "body": compressed})
+        if len(self.buffer) >= self.middleware.minimum_size:
+            # a large streamed body: compress it as it comes
+            data, self.buffer = bytes(self.buffer), bytearray()
+            await self._begin_stream()
+            await self._send_chunk(data, True)
+
+    async def _begin_stream(self):
+        self.mode = "stream"
+        self.stream = self.encoder.stream()
+        COMPRESSED_RESPONSES.labels(self.encoder.name, "stream").inc()
+        await self.send(self._compressed_start(None))
+
+    async def _send_chunk(self, body: bytes, more: bool):
+        compress, flush, finish = self.stream
+        data = compress(body) + (flush() if more else finish())
+        await self.send({"type": "http.response.body", "body": data, "more_body": more})
+
+    def _compressed_start(self, length: int | None) -> dict:
+        headers = [
+            (name, value) for name, value in self.start.get("headers", [])
+            if name.lower() not in (b"content-length", b"vary")
+        ]
+        vary = [value for name, value in self.start.get("headers", []) if name.lower() == b"vary"]
+        headers.append((b"content-encoding", self.encoder.name.encode()))
+        headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode()))
+        start, self.start = dict(self.start), None
+        start["headers"] = headers
+        return start
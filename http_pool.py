@@ -0,0 +1,90 @@
+"""A shared, pooled outbound HTTP client with connection-reuse metrics.
+
+Opening a new `httpx.AsyncClient` per call costs a TCP (and TLS) handshake
+every time. `pooled_client()` builds one keep-alive client for the
+lifetime of a server. It uses HTTP/2 when the optional `h2` package is
+installed. Each request is tagged through httpcore's "trace" extension,
+which records whether it opened a new connection or reused a pooled one:
+
+    async with pooled_client(max_connections=50, timeout=10.0) as client:
+        await client.get("https://api.github.com/user")
+
+Counts go to `http_client_requests_total{host,connection,http_version}`
+(connection is "new" or "reused"). Latency goes to
+`http_client_request_seconds{host}`.
+"""
+
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+from metrics import REGISTRY
+
+HTTP_CLIENT_REQUESTS = REGISTRY.counter(
+    "http_client_requests_total", "Outbound requests, by host and whether the connection was reused.",
+    ["host", "connection", "http_version"])
+HTTP_CLIENT_DURATION = REGISTRY.histogram(
+    "http_client_request_seconds", "Outbound request latency, headers received.", ["host"])
+HTTP_CLIENT_CONNECTS = REGISTRY.histogram(
+    "http_client_connect_seconds", "Time to open a new outbound connection (TCP, TLS).", ["host"])
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  optional dependency of httpx[http2]
+    except ImportError:
+        return False
+    return True
+
+
+async def _on_request(request: httpx.Request) -> None:
+    state = {"new": False, "started": time.perf_counter(), "connect_started": None}
+    request.extensions["pool_state"] = state
+
+    async def trace(event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.started":
+            state["new"] = True
+            state["connect_started"] = time.perf_counter()
+        elif event in ("connection.start_tls.complete", "connection.connect_tcp.complete") and state["connect_started"]:
+            state["connect_done"] = time.perf_counter()
+
+    request.extensions["trace"] = trace
+
+
+async def _on_response(response: httpx.Response) -> None:
+    state = response.request.extensions.get("pool_state")
+    if state is None:
+        return
+    host = response.request.url.host
+    if state.get("connect_done"):
+        HTTP_CLIENT_CONNECTS.labels(host).observe(state["connect_done"] - state["connect_started"])
+    HTTP_CLIENT_REQUESTS.labels(host, "new" if state["new"] else "reused", response.http_version).inc()
+    HTTP_CLIENT_DURATION.labels(host).observe(time.perf_counter() - state["started"])
+
+
+def build_client(max_connections: int = 100, max_keepalive: int = 20, keepalive_expiry: float = 30.0,
+                 timeout: float = 10.0, connect_timeout: float = 5.0, http2: bool = True,
+                 **kwargs) -> httpx.AsyncClient:
+    """An AsyncClient with pool limits, timeouts and reuse tracking (HTTP/2 if requested and available)."""
+    return httpx.AsyncClient(
+        http2=http2 and http2_available(),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        follow_redirects=True,
+        event_hooks={"request": [_on_request], "response": [_on_response]},
+        **kwargs,
+    )
+
+
+@asynccontextmanager
+async def pooled_client(**options):
+    client = build_client(**options)
+    try:
+        yield client
+    finally:
+        await client.aclose()
@@ -0,0 +1,296 @@
+"""Asynchronous job mode for long-running tools.
+
+A tool decorated with `jobs.job_tool` does not do its work inside the
+tools/call request. It submits the work to a `JobManager` and returns a job
+id at once, which frees the HTTP request and the client session. Clients
+then poll with the job tools that `JobManager.register()` adds:
+
+- job_status(job_id): state, timings and error, if any.
+- job_result(job_id): the result of a finished job.
+- job_cancel(job_id): cancels a queued or running job.
+
+    jobs = JobManager(workers=2, max_queued=16, ttl=3600)
+    jobs.register(first_mcp)
+
+    @first_mcp.tool()
+    @jobs.job_tool
+    def convert_document(source: str) -> str:
+        ...
+
+At most `workers` jobs run at once; the rest wait their turn. Beyond
+`max_queued` waiting jobs, submissions are refused with the retryable
+`admission.Overloaded` error. Async functions run on the event loop. Sync
+functions run in a thread, which cannot be interrupted: cancelling one
+marks the job cancelled and discards the result when it arrives. The
+thread keeps its worker slot until it returns.
+
+Finished jobs are kept for `ttl` seconds. With `store_path`, every state
+change (queued, running, finished) is also written to SQLite. Results
+then outlive a restart, and any worker process sharing the file can
+answer job_status and job_result. This is required when a server runs in
+several workers. job_cancel only reaches jobs running in the worker that
+receives it. Job ids are long random tokens, and knowing the id is what
+grants access to the result.
+
+A job runs after its request has ended, so it cannot use the request's
+Context (progress, elicitation, sampling).
+"""
+
+import asyncio
+import inspect
+import json
+import secrets
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any
+
+from fastmcp.exceptions import ToolError
+
+from admission import Overloaded
+from metrics import REGISTRY
+from structured_log import get_logger
+
+log = get_logger("jobs")
+
+JOBS_ACTIVE = REGISTRY.gauge("mcp_jobs_active", "Jobs queued or running.", ["state"])
+JOBS_FINISHED = REGISTRY.counter("mcp_jobs_finished_total", "Finished jobs, by tool and outcome.", ["tool", "status"])
+JOB_DURATION = REGISTRY.histogram("mcp_job_duration_seconds", "Job run time, excluding queueing.", ["tool"])
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+@dataclass
+class Job:
+    id: str
+    tool: str
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    result: Any = None
+    error: str | None = None
+    task: asyncio.Task | None = field(default=None, repr=False)
+
+    def info(self) -> dict:
+        return {
+            "job_id": self.id,
+            "tool": self.tool,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+class SQLiteJobStore:
+    """Jobs (with JSON results once finished) in a SQLite file, expiring after their TTL."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, tool TEXT, status TEXT, "
+                "created_at REAL, started_at REAL, finished_at REAL, result TEXT, error TEXT, expires_at REAL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def save(self, job: Job, expires_at: float) -> None:
+        try:
+            result = json.dumps(job.result, default=str)
+        except ValueError as e:
+            result, job.error = None, f"result not storable: {e}"
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.tool, job.status, job.created_at, job.started_at,
+                 job.finished_at, result, job.error, expires_at),
+            )
+
+    def load(self, job_id: str) -> Job | None:
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT id, tool, status, created_at, started_at, finished_at, result, error "
+                "FROM jobs WHERE id = ? AND expires_at > ?", (job_id, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        job = Job(*row[:6], error=row[7])
+        job.result = json.loads(row[6]) if row[6] is not None else None
+        return job
+
+    def purge(self) -> int:
+        with self._connect() as db:
+            return db.execute("DELETE FROM jobs WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+class JobManager:
+    def __init__(self, workers: int = 4, max_queued: int = 64, ttl: float = 3600.0,
+                 store_path: str | None = None, purge_every: float = 60.0):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self.store = SQLiteJobStore(store_path) if store_path else None
+        self.purge_every = purge_every
+        self._jobs: dict[str, Job] = {}
+        self._slots: asyncio.Semaphore | None = None
+        self._queued = 0
+        self._running = 0
+        self._next_purge = time.monotonic() + purge_every
+
+    # submission
+
+    async def submit(self, tool: str, fn, *args, **kwargs) -> Job:
+        """Queue `fn(*args, **kwargs)` and return its job without waiting."""
+        await self._maybe_purge()
+        if self._queued >= self.max_queued:
+            raise Overloaded("jobs", "queue_full", retry_after=1.0)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        job = Job(id=secrets.token_urlsafe(16), tool=tool)
+        await self._persist(job)
+        self._jobs[job.id] = job
+        self._set_queued(+1)
+        job.task = asyncio.get_running_loop().create_task(self._run(job, fn, args, kwargs), name=f"job:{tool}")
+        return job
+
+    async def _run(self, job: Job, fn, args, kwargs) -> None:
+        try:
+            await self._slots.acquire()
+            self._set_queued(-1)
+            self._set_running(+1)
+            job.status, job.started_at = "running", time.time()
+            thread = None
+            try:
+                await self._persist(job)
+                if inspect.iscoroutinefunction(fn):
+                    job.result = await fn(*args, **kwargs)
+                else:
+                    thread = asyncio.ensure_future(asyncio.to_thread(fn, *args, **kwargs))
+                    job.result = await asyncio.shield(thread)
+                job.status = "succeeded"
+            finally:
+                JOB_DURATION.labels(job.tool).observe(time.time() - job.started_at)
+                if thread is not None and not thread.done():
+                    # cancelled, but the thread cannot be stopped: it keeps
+                    # its slot until it returns, so at most `workers` run
+                    thread.add_done_callback(self._release_after_thread)
+                else:
+                    self._release()
+        except asyncio.CancelledError:
+            if job.status == "queued":
+                self._set_queued(-1)
+            job.status, job.result = "cancelled", None
+        except Exception as e:
+            job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+            log.warning("Job failed", extra={"job_id": job.id, "tool": job.tool, "error": repr(e)})
+        finally:
+            job.finished_at = time.time()
+            job.task = None
+            JOBS_FINISHED.labels(job.tool, job.status).inc()
+            await self._persist(job)
+
+    async def _persist(self, job: Job) -> None:
+        if self.store is not None:
+            await asyncio.to_thread(self.store.save, job, (job.finished_at or time.time()) + self.ttl)
+
+    def _release(self) -> None:
+        self._set_running(-1)
+        self._slots.release()
+
+    def _release_after_thread(self, thread: asyncio.Future) -> None:
+        if not thread.cancelled():
+            # retrieve it so a late failure isn't reported as never retrieved
+            thread.exception()
+        self._release()
+
+    def _set_queued(self, delta: int) -> None:
+        self._queued += delta
+        JOBS_ACTIVE.labels("queued").set(self._queued)
+
+    def _set_running(self, delta: int) -> None:
+        self._running += delta
+        JOBS_ACTIVE.labels("running").set(self._running)
+
+    # lookup
+
+    async def get(self, job_id: str) -> Job:
+        await self._maybe_purge()
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = await asyncio.to_thread(self.store.load, job_id)
+        if job is None:
+            raise ToolError(f"Unknown or expired job: {job_id}")
+        return job
+
+    async def result(self, job_id: str) -> Any:
+        job = await self.get(job_id)
+        if job.status == "succeeded":
+            return job.result
+        if job.status == "failed":
+            raise ToolError(f"Job failed: {job.error}")
+        if job.status == "cancelled":
+            raise ToolError("Job was cancelled")
+        raise ToolError(f"Job is still {job.status}; poll job_status")
+
+    async def cancel(self, job_id: str) -> Job:
+        job = await self.get(job_id)
+        if job.task is not None:
+            job.task.cancel()
+            # let the job record its cancellation before reporting
+            await asyncio.wait([job.task], timeout=1.0)
+        return job
+
+    async def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.purge_every
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if self.store is not None:
+            await asyncio.to_thread(self.store.purge)
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "queued": self._queued, "running": self._running, "kept": len(self._jobs)}
+
+    # tools
+
+    def job_tool(self, func):
+        """Make `func` a job tool: calls submit it and return the job id right away."""
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        async def submit(*args, **kwargs) -> dict:
+            job = await self.submit(func.__name__, func, *args, **kwargs)
+            return {"job_id": job.id, "status": job.status,
+                    "hint": "poll job_status, then fetch job_result"}
+
+        submit.__signature__ = signature.replace(return_annotation=dict)
+        submit.__annotations__ = {**func.__annotations__, "return": dict}
+        return submit
+
+    def register(self, server) -> None:
+        """Add job_status, job_result and job_cancel tools to a fastmcp server."""
+
+        @server.tool(name="job_status")
+        async def job_status(job_id: str) -> dict:
+            """State of a job started by a job tool (queued, running, succeeded, failed, cancelled)."""
+            return (await self.get(job_id)).info()
+
+        @server.tool(name="job_result")
+        async def job_result(job_id: str) -> Any:
+            """Result of a finished job; fails while the job is still queued or running."""
+            return await self.result(job_id)
+
+        @server.tool(name="job_cancel")
+        async def job_cancel(job_id: str) -> dict:
+            """Cancel a queued or running job."""
+            return (await self.cancel(job_id)).info()
@@ -0,0 +1,219 @@
+"""Production launcher: run an ASGI app in N worker processes on one port.
+
+Every worker is a separate interpreter running its own uvicorn server and its
+own copy of the app lifespan (so both mounted MCP apps start and stop inside
+each worker). Where the kernel supports SO_REUSEPORT each worker binds its own
+listening socket on the same port and the kernel spreads connections across
+them; otherwise the parent binds one socket that all workers accept from.
+
+The parent process only supervises:
+- startup waits for every worker to finish its lifespan startup, and aborts
+  the whole launch if one fails,
+- workers that die, stop sending heartbeats or never finish starting are
+  replaced,
+- SIGTERM/SIGINT are forwarded so each worker stops accepting, drains
+  in-flight requests (up to `graceful_timeout`) and runs lifespan shutdown.
+
+`worker_health()` gives per-worker status from inside any worker, for a
+health route; `worker_count()` tells an app whether its state must be
+shared between processes.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+import types
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = 1.0
+HEARTBEAT_TIMEOUT = 15.0
+STARTUP_TIMEOUT = 60.0
+
+# set inside worker processes: (worker index, shared heartbeat array, shared pid array)
+_worker_state = None
+# the worker count, exported before spawning so the app sees it at import time
+WORKERS_ENV = "MCP_WORKERS"
+
+
+def _bind(host: str, port: int, reuse_port: bool) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+async def _serve(server: uvicorn.Server, sock: socket.socket, index: int, heartbeats) -> None:
+    serving = asyncio.create_task(server.serve(sockets=[sock]))
+    # heartbeats start only once lifespan startup has completed
+    while not server.started and not serving.done():
+        await asyncio.sleep(0.05)
+    while not serving.done():
+        heartbeats[index] = time.time()
+        await asyncio.wait({serving}, timeout=HEARTBEAT_INTERVAL)
+    await serving
+
+
+def _worker(index, app, host, port, shared_socket, heartbeats, pids, uvicorn_options) -> None:
+    global _worker_state
+    _worker_state = (index, heartbeats, pids)
+    pids[index] = os.getpid()
+    sock = shared_socket or _bind(host, port, reuse_port=True)
+    config = uvicorn.Config(app, lifespan="on", **uvicorn_options)
+    server = uvicorn.Server(config)
+    asyncio.run(_serve(server, sock, index, heartbeats))
+
+
+def worker_health() -> dict:
+    """Status of every worker, readable from any worker process."""
+    if _worker_state is None:
+        return {"mode": "single-process", "pid": os.getpid()}
+    index, heartbeats, pids = _worker_state
+    now = time.time()
+    return {
+        "mode": "multi-worker",
+        "this_worker": index,
+        "workers": [
+            {
+                "index": i,
+                "pid": pids[i],
+                "heartbeat_age_s": round(now - beat, 3) if beat else None,
+                "healthy": bool(beat) and now - beat < HEARTBEAT_TIMEOUT,
+            }
+            for i, beat in enumerate(heartbeats)
+        ],
+    }
+
+
+def worker_count() -> int:
+    """How many workers the app is running in (1 outside the launcher).
+
+    Valid at import time: workers import the app before `_worker` runs,
+    so this reads the count the parent exported rather than `_worker_state`.
+    """
+    return int(os.environ.get(WORKERS_ENV, "1"))
+
+
+def serve(
+    app: str,
+    host: str = "0.0.0.0",
+    port: int = 8010,
+    workers: int | None = None,
+    graceful_timeout: float = 30.0,
+    log_level: str = "info",
+) -> int:
+    """Run `app` ("module:attribute") in `workers` processes until SIGTERM/SIGINT."""
+    workers = workers or os.cpu_count() or 1
+    os.environ[WORKERS_ENV] = str(workers)
+    context = multiprocessing.get_context("spawn")
+    heartbeats = context.Array("d", workers, lock=False)
+    pids = context.Array("i", workers, lock=False)
+    reuse_port = hasattr(socket, "SO_REUSEPORT")
+    shared_socket = None if reuse_port else _bind(host, port, reuse_port=False)
+    if reuse_port:
+        # bind once in the parent so a taken port fails here, not in every worker
+        _bind(host, port, reuse_port=True).close()
+    uvicorn_options = {
+        "host": host,
+        "port": port,
+        "timeout_graceful_shutdown": graceful_timeout,
+        "log_level": log_level,
+    }
+
+    processes: list = [None] * workers
+    # when each worker was (re)spawned, for its startup deadline
+    spawned_at = [0.0] * workers
+
+    def start(index: int) -> None:
+        heartbeats[index] = 0.0
+        spawned_at[index] = time.monotonic()
+        process = context.Process(
+            target=_worker,
+            args=(index, app, host, port, shared_socket, heartbeats, pids, uvicorn_options),
+            name=f"worker-{index}",
+        )
+        # spawn re-runs the parent's __main__ (usually the server script) in
+        # the child as __mp_main__; the worker imports the app itself, so
+        # hide it to keep the app from being imported twice
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            process.start()
+        finally:
+            sys.modules["__main__"] = main
+        processes[index] = process
+
+    stopping = False
+
+    def on_signal(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    for index in range(workers):
+        start(index)
+    logger.info("Started %d workers on %s:%d (SO_REUSEPORT=%s)", workers, host, port, reuse_port)
+
+    # coordinated startup: every worker must get through its lifespan
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while not stopping and not all(heartbeats):
+        if any(not p.is_alive() for p in processes) or time.monotonic() > deadline:
+            logger.error("A worker failed during startup, shutting down")
+            stopping = True
+            break
+        time.sleep(0.1)
+    else:
+        if not stopping:
+            logger.info("All %d workers ready", workers)
+
+    while not stopping:
+        time.sleep(HEARTBEAT_INTERVAL)
+        for index, process in enumerate(processes):
+            if stopping:
+                break
+            if heartbeats[index]:
+                stale = time.time() - heartbeats[index] > HEARTBEAT_TIMEOUT
+                reason = "stopped responding"
+            else:
+                # a worker that hangs before its first heartbeat
+                stale = time.monotonic() - spawned_at[index] > STARTUP_TIMEOUT
+                reason = f"did not start within {STARTUP_TIMEOUT:.0f}s"
+            if not process.is_alive() or stale:
+                logger.warning(
+                    "Worker %d (pid %s) %s, restarting", index, process.pid,
+                    reason if process.is_alive() else f"exited with {process.exitcode}",
+                )
+                if process.is_alive():
+                    process.kill()
+                process.join()
+                start(index)
+
+    # graceful drain: uvicorn stops accepting, finishes in-flight requests
+    # and runs lifespan shutdown on SIGTERM
+    for process in processes:
+        if process.is_alive():
+            os.kill(process.pid, signal.SIGTERM)
+    deadline = time.monotonic() + graceful_timeout + 5
+    for process in processes:
+        process.join(max(0.0, deadline - time.monotonic()))
+        if process.is_alive():
+            logger.warning("Worker pid %s did not drain in time, killing", process.pid)
+            process.kill()
+            process.join()
+    if shared_socket is not None:
+        shared_socket.close()
+    return 0
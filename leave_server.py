@@ -2,16 +2,20 @@ from typing import Any, Awaitable, Callable
 
 # FastMCP and Starlette imports
 import fastmcp
-from fastmcp import FastMCP
 from fastmcp.exceptions import NotFoundError
 from fastmcp.server.auth.auth import OAuthProvider
 from fastmcp.server.middleware import MiddlewareContext
 from fastmcp.tools import Tool
 from starlette.middleware import Middleware as ASGIMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 from starlette.exceptions import HTTPException
 import anyio, time
+from rate_limit import Policy, build_rate_limiter
+from structured_log import get_logger
+
+log = get_logger("leave_server")
 # --- 1. Role-based Bearer Auth Provider ---
 # Handles AUTHENTICATION by checking the token and returning user context.
 class RoleBasedBearerAuth(OAuthProvider):
@@ -21,7 +25,8 @@ class RoleBasedBearerAuth(OAuthProvider):
         Returns a dictionary with user info, which becomes available in the context.
         """
         token = request.headers.get("Authorization", "").replace("Bearer ", "")
-        print(f"[AUTH] Authenticating with token: '{token}'")
+        # never log the token itself
+        log.debug("Authenticating request", extra={"has_token": bool(token)})
         
         # In a real app, this would be a database/API call.
         if token == "employee-token":
@@ -53,7 +58,7 @@ async def role_based_auth_middleware(
     if not user_role:
         raise NotFoundError("User role not found in authentication context.")
 
-    print(f"[MIDDLEWARE] User role: '{user_role}' | Method: '{context.method}'")
+    log.debug("Authorizing request", extra={"role": user_role, "method": context.method})
 
     # A. Handle filtering the list of tools
     if context.method == "tools/list":
@@ -69,7 +74,10 @@ async def role_based_auth_middleware(
             if not required_roles or user_role in required_roles:
                 accessible_tools.append(tool)
         
-        print(f"[MIDDLEWARE] Filtering tools: {len(all_tools)} total -> {len(accessible_tools)} accessible for '{user_role}'.")
+        log.debug(
+            "Filtered tools",
+            extra={"role": user_role, "total": len(all_tools), "accessible": len(accessible_tools)},
+        )
         return accessible_tools
 
     # B. Handle authorizing a direct tool call (CRITICAL SECURITY STEP)
@@ -83,22 +91,42 @@ async def role_based_auth_middleware(
             
         required_roles = {tag.split(":", 1)[1] for tag in tool_to_call.tags if tag.startswith("role:")}
         if required_roles and user_role not in required_roles:
-            print(f"[MIDDLEWARE] DENIED call to '{tool_name}' for role '{user_role}'. Requires one of: {required_roles}")
+            log.warning(
+                "Tool call denied",
+                extra={"tool": tool_name, "role": user_role, "required_roles": sorted(required_roles)},
+            )
             # Raise NotFoundError to hide the existence of the tool from unauthorized users.
             raise NotFoundError(f"Unknown tool: {tool_name}")
         
-        print(f"[MIDDLEWARE] ALLOWED call to '{tool_name}' for role '{user_role}'.")
+        log.debug("Tool call allowed", extra={"tool": tool_name, "role": user_role})
 
     # For all other methods (e.g., resources/list), let them pass through.
     return await call_next(context)
 
+# Per-token request budgets by role; one noisy client can't starve the rest.
+rate_limiter = build_rate_limiter(
+    policies={
+        "employee": Policy(rate=5, burst=10),
+        "manager": Policy(rate=10, burst=20),
+        "md": Policy(rate=20, burst=40),
+    },
+    default=Policy(rate=2, burst=5),
+)
+
+# Unauthenticated endpoints for probes and scrapers.
+PUBLIC_PATHS = {"/health", "/metrics"}
+
 async def bearer_token_auth_asgi_middleware(request, call_next):
     """
     This is an ASGI middleware. It runs before FastMCP.
-    It's responsible for AUTHENTICATION. It checks the HTTP Authorization header,
-    finds the user, and puts their info into the FastMCP context state for
-    later use by our authorization middleware.
+    It's responsible for AUTHENTICATION and rate limiting. It checks the HTTP
+    Authorization header, finds the user, and puts their info into the request
+    state (`request.state.user_role` / `user_name`) for later use by our
+    authorization middleware via `get_http_request()`.
     """
+    if request.url.path in PUBLIC_PATHS:
+        return await call_next(request)
+
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
         return JSONResponse(
@@ -114,14 +142,23 @@ async def bearer_token_auth_asgi_middleware(request, call_next):
             status_code=403,
             content={"error": "Forbidden", "detail": "Invalid token."},
         )
+
+    limit = await rate_limiter.check(token, user_info["role"])
+    if not limit.allowed:
+        return JSONResponse(
+            status_code=429,
+            content={"error": "Too Many Requests", "detail": "Rate limit exceeded."},
+            headers=limit.headers(),
+        )
     
-    # This is the key part: we inject user data into the context's state.
-    # The FastMCP server will create a context per request, and this state
-    # will be available to all FastMCP middleware and handlers.
-    fastmcp.server.context.get_context().state["user_role"] = user_info["role"]
-    fastmcp.server.context.get_context().state["user_name"] = user_info["name"]
+    # This is the key part: we inject user data into the request state.
+    # It is shared with the request FastMCP sees, so it is available to all
+    # FastMCP middleware and handlers.
+    request.state.user_role = user_info["role"]
+    request.state.user_name = user_info["name"]
 
     response = await call_next(request)
+    response.headers.update(limit.headers())
     return response
 
 USER_TOKENS = {
@@ -131,24 +168,25 @@ USER_TOKENS = {
 }
 
 from fastmcp.server.middleware import Middleware, MiddlewareContext
-from fastmcp.server.middleware.middleware import ListToolsResult
 from fastmcp.exceptions import ToolError
+from catalog_cache import CatalogFastMCP, FilteredCatalog
+from loop_monitor import LoopMonitorMiddleware, debug_loop_route
+from admission import AdmissionControlMiddleware
+from metrics import metrics_response
 
 class ListingFilterMiddleware(Middleware):
+    def __init__(self):
+        # filtered tools/list, recomputed only when tools change
+        self.catalog = FilteredCatalog()
+
     async def on_list_tools(self, context: MiddlewareContext, call_next):
-        list_of_tools = await call_next(context)
-        
-        # Filter out tools with "private" tag
-        # filtered_tools = {
-        #     name: tool for name, tool in list_of_tools
-        #     if "private" not in tool.tags
-        # }
-        
-        filtered_tools = [tool for tool in list_of_tools if "employee" in tool.tags]
+        entry = self.catalog.lookup("employee")
+        if entry is None:
+            list_of_tools = await call_next(context)
+            entry = self.catalog.store("employee", list_of_tools, lambda tool: "employee" in tool.tags)
 
         # Return modified result
-        return filtered_tools
-        return ListToolsResult(tools=filtered_tools)
+        return entry.tools
     
     async def on_call_tool(self, context: MiddlewareContext, call_next):
         # Access the tool object to check its metadata
@@ -182,16 +220,19 @@ async def add_process_time_header(request: Request, call_next):
     # response.headers["X-Process-Time"] = str(process_time)
     return response
 
-asgi_middlewares = [ASGIMiddleware(bearer_token_auth_asgi_middleware)]
-server = FastMCP(
+# Runs in the HTTP layer, in front of FastMCP: pass to http_app()/run_http_async().
+asgi_middlewares = [ASGIMiddleware(BaseHTTPMiddleware, dispatch=bearer_token_auth_asgi_middleware)]
+server = CatalogFastMCP(
     name="LeaveManagementMCP",
     instructions="Use tools to apply for or approve leaves.",
     # auth=RoleBasedBearerAuth(),
     # middleware=bearer_token_auth_asgi_middleware,
 )
-server.add_middleware(bearer_token_auth_asgi_middleware)
 server.add_middleware(add_process_time_header)
+server.add_middleware(LoopMonitorMiddleware())
 server.add_middleware(ListingFilterMiddleware())
+# global cap on concurrent tool calls; excess calls are shed with a retryable error
+server.add_middleware(AdmissionControlMiddleware())
 
 # --- 4. Define Tools with Decorators ---
 # This is the modern, ergonomic way to define and register tools.
@@ -214,6 +255,14 @@ async def health_check(request: Request):
     """A simple health check endpoint."""
     return JSONResponse({"status": "ok"})
 
+# Event loop lag and recent stalls (with stacks), for debugging slow requests.
+server.custom_route("/debug/loop", methods=["GET"])(debug_loop_route)
+
+# Prometheus metrics, including admission queue depth and rejections.
+@server.custom_route("/metrics", methods=["GET"])
+async def metrics_route(request: Request):
+    return metrics_response()
+
 # --- 6. Run the Server ---
 # The entry point for our application.
 async def main():
@@ -231,7 +280,7 @@ async def main():
         # transport="http",
         host="127.0.0.1",
         port=8001,
-        # middleware=asgi_middlewares,
+        middleware=asgi_middlewares,
         path="/mcp" # The main path for MCP communication
     )
 
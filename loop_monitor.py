@@ -0,0 +1,238 @@
+"""Event-loop lag monitor and stall detector.
+
+A heartbeat task sleeps for `interval` in a loop and records how late it
+wakes up: that lateness is the loop lag every other request saw too. A
+watchdog thread checks that the heartbeat keeps beating. Once the loop has
+been blocked for `stall_threshold`, it snapshots the loop thread's stack
+(`sys._current_frames()`), the running task and its active label. When
+the loop comes back, the heartbeat records how long the stall lasted.
+
+Labels come from `LoopMonitorMiddleware`: the MCP method and
+`tool:<name>` around each request. So a stall is attributed to the tool
+or middleware that was running, and `culprit` names the innermost frame
+in our own code.
+
+    first_mcp.add_middleware(LoopMonitorMiddleware())   # starts on first request
+    first_mcp.custom_route("/debug/loop", methods=["GET"])(debug_loop_route)
+
+    mcp = FastMCP("...", lifespan=monitor.lifespan)     # mcp SDK servers
+"""
+
+import asyncio
+import sys
+import sysconfig
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from contextlib import asynccontextmanager, contextmanager
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from metrics import REGISTRY
+
+LOOP_LAG = REGISTRY.histogram(
+    "event_loop_lag_seconds", "How late the loop monitor's heartbeat woke up.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+LOOP_STALLS = REGISTRY.counter(
+    "event_loop_stalls_total", "Event loop stalls longer than the threshold, by active label.", ["label"])
+
+# frames from these directories are never reported as the culprit
+_LIBRARY_DIRS = tuple({sysconfig.get_paths()[key] for key in ("stdlib", "platstdlib", "purelib", "platlib")})
+
+
+def _culprit(stack: traceback.StackSummary) -> str | None:
+    for frame in reversed(stack):
+        if not frame.filename.startswith(_LIBRARY_DIRS) and not frame.filename.startswith("<"):
+            return f"{frame.filename}:{frame.lineno} in {frame.name}"
+    return None
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = 0.05, stall_threshold: float = 0.1,
+                 max_stalls: int = 50, samples: int = 2048, stack_limit: int = 30):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.stack_limit = stack_limit
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: int | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._last_beat = 0.0
+        # (beat the watchdog saw, stall record) for the stall in progress
+        self._pending: tuple[float, dict] | None = None
+        # task -> label stack, maintained by label()
+        self._labels: dict[asyncio.Task | None, list[str]] = {}
+        self._lags: deque[float] = deque(maxlen=samples)
+        self.max_lag = 0.0
+        self.stalls: deque[dict] = deque(maxlen=max_stalls)
+        self.stalls_by_label: Counter[str] = Counter()
+
+    # lifecycle
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def ensure_started(self) -> None:
+        """Start on the running loop unless already monitoring it."""
+        if not self.running or self._loop is not asyncio.get_running_loop():
+            self.start()
+
+    def start(self) -> None:
+        if self.running:
+            self._task.cancel()
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._task = self._loop.create_task(self._heartbeat(), name="loop-monitor")
+        if self._stop.is_set() and self._watchdog is not None:
+            # a stop() just asked the old watchdog to exit
+            self._watchdog.join()
+        if self._watchdog is None or not self._watchdog.is_alive():
+            self._stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @asynccontextmanager
+    async def lifespan(self, app=None):
+        """Monitor the loop while the app runs (usable as a FastMCP/Starlette lifespan)."""
+        started = not self.running
+        if started:
+            self.start()
+        try:
+            yield
+        finally:
+            if started:
+                await self.stop()
+
+    # attribution
+
+    @contextmanager
+    def label(self, name: str):
+        """Attribute stalls inside this block (in the current task) to `name`."""
+        task = asyncio.current_task()
+        labels = self._labels.setdefault(task, [])
+        labels.append(name)
+        try:
+            yield
+        finally:
+            labels.pop()
+            if not labels:
+                self._labels.pop(task, None)
+
+    # measurement
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time()
+            await asyncio.sleep(self.interval)
+            previous_beat, self._last_beat = self._last_beat, time.monotonic()
+            self._record(max(0.0, loop.time() - scheduled - self.interval), previous_beat)
+
+    def _record(self, lag: float, previous_beat: float) -> None:
+        pending, self._pending = self._pending, None
+        self._lags.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+        LOOP_LAG.observe(lag)
+        if lag < self.stall_threshold:
+            return
+        if pending is not None and pending[0] == previous_beat:
+            stall = pending[1]
+        else:
+            # too short for the watchdog to catch: timing only
+            stall = {"started_at": round(time.time() - lag, 3), "label": None, "labels": [],
+                     "task": None, "culprit": None, "stack": None}
+        stall["duration_ms"] = round(lag * 1000, 1)
+        self.stalls.append(stall)
+        label = stall["label"] or "unknown"
+        self.stalls_by_label[label] += 1
+        LOOP_STALLS.labels(label).inc()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.stall_threshold / 2):
+            beat = self._last_beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked >= self.stall_threshold and (self._pending is None or self._pending[0] != beat):
+                self._pending = (beat, self._capture(blocked))
+
+    def _capture(self, blocked: float) -> dict:
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = traceback.extract_stack(frame, limit=self.stack_limit) if frame is not None else None
+        task = asyncio.current_task(self._loop)
+        labels = self._labels.get(task)
+        return {
+            "started_at": round(time.time() - blocked, 3),
+            "label": labels[-1] if labels else None,
+            "labels": list(labels) if labels else [],
+            "task": task.get_name() if task is not None else None,
+            "culprit": _culprit(stack) if stack else None,
+            "stack": stack.format() if stack else None,
+        }
+
+    # reporting
+
+    def snapshot(self, stalls: int = 10) -> dict:
+        lags = sorted(self._lags)
+
+        def ms(value: float | None) -> float | None:
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            "running": self.running,
+            "interval_ms": ms(self.interval),
+            "stall_threshold_ms": ms(self.stall_threshold),
+            "lag_ms": {
+                "last": ms(self._lags[-1]) if lags else None,
+                "p50": ms(lags[len(lags) // 2]) if lags else None,
+                "p99": ms(lags[int(len(lags) * 0.99)]) if lags else None,
+                "max": ms(self.max_lag),
+            },
+            "stalls_total": sum(self.stalls_by_label.values()),
+            "stalls_by_label": dict(self.stalls_by_label),
+            "recent_stalls": list(self.stalls)[-stalls:] if stalls > 0 else [],
+        }
+
+
+monitor = LoopMonitor()
+
+
+class LoopMonitorMiddleware(Middleware):
+    """Label requests and tool calls for stall attribution; starts the monitor."""
+
+    def __init__(self, loop_monitor: LoopMonitor | None = None):
+        self.monitor = loop_monitor or monitor
+
+    async def on_request(self, context: MiddlewareContext, call_next):
+        self.monitor.ensure_started()
+        with self.monitor.label(context.method):
+            return await call_next(context)
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        with self.monitor.label(f"tool:{context.message.name}"):
+            return await call_next(context)
+
+
+async def debug_loop_route(request: Request) -> JSONResponse:
+    """Loop lag percentiles and recent stalls with their stacks."""
+    try:
+        stalls = int(request.query_params.get("stalls", 10))
+    except ValueError:
+        stalls = -1
+    if stalls < 0:
+        return JSONResponse({"error": "stalls must be a non-negative integer"}, status_code=400)
+    return JSONResponse(monitor.snapshot(stalls=stalls))
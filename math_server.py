@@ -1,97 +1,482 @@
 # basic import 
-from mcp.server.fastmcp import FastMCP
+import ast
+import functools
 import math
+from cpu_offload import cpu_bound
+from tool_cache import CachingFastMCP
+import numpy as np
+from array_codec import MAX_ELEMENTS, ArrayPayload, decode_array, encode_array
+from loop_monitor import monitor
 
-# instantiate an MCP server client
-mcp = FastMCP("Hello World")
+# instantiate an MCP server client, pure tools below cache their results;
+# the loop monitor runs for the lifetime of the server
+mcp = CachingFastMCP("Hello World", lifespan=monitor.lifespan)
 
 # DEFINE TOOLS
 
 #addition tool
-@mcp.tool()
+@mcp.cached_tool()
 def add(a: int, b: int) -> int:
     """Add two numbers"""
     return int(a + b)
 
 # subtraction tool
-@mcp.tool()
+@mcp.cached_tool()
 def subtract(a: int, b: int) -> int:
     """Subtract two numbers"""
     return int(a - b)
 
 # multiplication tool
-@mcp.tool()
+@mcp.cached_tool()
 def multiply(a: int, b: int) -> int:
     """Multiply two numbers"""
     return int(a * b)
 
 #  division tool
-@mcp.tool() 
+@mcp.cached_tool()
 def divide(a: int, b: int) -> float:
     """Divide two numbers"""
     return float(a / b)
 
-# power tool
-@mcp.tool()
+# power tool, offloaded once the result grows past ~100k bits
+@mcp.cached_tool()
+@cpu_bound(cost=lambda a, b: b * math.log2(abs(a) or 1), inline_below=100_000, timeout=10)
 def power(a: int, b: int) -> int:
     """Power of two numbers"""
     return int(a ** b)
 
 # square root tool
-@mcp.tool()
+@mcp.cached_tool()
 def sqrt(a: int) -> float:
     """Square root of a number"""
     return float(a ** 0.5)
 
 # cube root tool
-@mcp.tool()
+@mcp.cached_tool()
 def cbrt(a: int) -> float:
     """Cube root of a number"""
     return float(a ** (1/3))
 
-# factorial tool
-@mcp.tool()
+# factorial tool, offloaded for large inputs
+@mcp.cached_tool()
+@cpu_bound(cost=lambda a: a, inline_below=20_000, timeout=10)
 def factorial(a: int) -> int:
     """factorial of a number"""
     return int(math.factorial(a))
 
 # log tool
-@mcp.tool()
+@mcp.cached_tool()
 def log(a: int) -> float:
     """log of a number"""
     return float(math.log(a))
 
 # remainder tool
-@mcp.tool()
+@mcp.cached_tool()
 def remainder(a: int, b: int) -> int:
     """remainder of two numbers divison"""
     return int(a % b)
 
 # sin tool
-@mcp.tool()
+@mcp.cached_tool()
 def sin(a: int) -> float:
     """sin of a number"""
     return float(math.sin(a))
 
 # cos tool
-@mcp.tool()
+@mcp.cached_tool()
 def cos(a: int) -> float:
     """cos of a number"""
     return float(math.cos(a))
 
 # tan tool
-@mcp.tool()
+@mcp.cached_tool()
 def tan(a: int) -> float:
     """tan of a number"""
     return float(math.tan(a))
 
+# SIZE GUARDS
+
+# largest integer result (in bits) batch_eval and evaluate will return, guards
+# "9**9**9"; results are serialised through str(), which python refuses past
+# 4300 digits (~14284 bits)
+MAX_RESULT_BITS = 14_000
+
+
+def _check_int(value):
+    if isinstance(value, int) and value.bit_length() > MAX_RESULT_BITS:
+        raise ValueError(f"result is too large to return (over {MAX_RESULT_BITS} bits)")
+    return value
+
+
+def _safe_power(a, b):
+    if isinstance(a, int) and isinstance(b, int) and abs(a) > 1 and b > 0:
+        if b * math.log2(abs(a)) > MAX_RESULT_BITS:
+            raise ValueError(f"{a} ** {b} is too large to compute")
+    return a ** b
+
+
+def _safe_factorial(a):
+    if a != int(a) or a < 0:
+        raise ValueError("factorial is only defined for non-negative integers")
+    if a > 1 and math.lgamma(a + 1) / math.log(2) > MAX_RESULT_BITS:
+        raise ValueError(f"factorial({a}) is too large to compute")
+    return math.factorial(int(a))
+
+
+# BATCH EVALUATION
+
+# vectorised kernels for the scalar tools above, keyed by tool name
+UNARY_OPS = {
+    "sqrt": np.sqrt,
+    "cbrt": np.cbrt,
+    "log": np.log,
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+}
+BINARY_OPS = {
+    "add": np.add,
+    "subtract": np.subtract,
+    "multiply": np.multiply,
+    "divide": np.true_divide,
+    "power": np.power,
+    "remainder": np.remainder,
+}
+# operations whose scalar tool returns an int
+INTEGER_OPS = {"add", "subtract", "multiply", "power", "remainder", "factorial"}
+# int64 is exact for these while every operand stays below 2**31
+INT64_SAFE_OPS = {"add", "subtract", "multiply"}
+
+
+def _checked_remainder(a, b):
+    return a % b if b != 0 else None
+
+
+def _checked_power(a, b):
+    try:
+        return int(_safe_power(a, b))
+    except ZeroDivisionError:
+        return None
+
+
+# exact python-int kernels for integral operands, applied elementwise
+INTEGER_KERNELS = {
+    "add": np.frompyfunc(lambda a, b: a + b, 2, 1),
+    "subtract": np.frompyfunc(lambda a, b: a - b, 2, 1),
+    "multiply": np.frompyfunc(lambda a, b: a * b, 2, 1),
+    "power": np.frompyfunc(_checked_power, 2, 1),
+    "remainder": np.frompyfunc(_checked_remainder, 2, 1),
+}
+
+
+def _is_integral(values) -> bool:
+    values = values if isinstance(values, list) else [values]
+    return all(isinstance(v, int) and not isinstance(v, bool) for v in values)
+
+
+def _evaluate_integral(operation: str, a, b=None) -> list:
+    """Integer operations on python ints, so results are exact at any size."""
+    if operation == "factorial":
+        return [_safe_factorial(x) for x in a]
+    if operation in INT64_SAFE_OPS:
+        small = np.asarray(a, dtype=object), np.asarray(b, dtype=object)
+        if all(np.all(np.abs(v) < 2**31) for v in small):
+            return np.atleast_1d(BINARY_OPS[operation](*(v.astype(np.int64) for v in small))).tolist()
+    result = INTEGER_KERNELS[operation](np.asarray(a, dtype=object), np.asarray(b, dtype=object))
+    return [_check_int(v) for v in np.atleast_1d(result).tolist()]
+
+
+def _evaluate(operation: str, a, b=None) -> list:
+    """Evaluate one operation over whole operand arrays in a single numpy call."""
+    if operation in BINARY_OPS and b is None:
+        raise ValueError(f"operation '{operation}' needs operand 'b'")
+    if operation not in UNARY_OPS and operation not in BINARY_OPS and operation != "factorial":
+        raise ValueError(f"Unknown operation: {operation}")
+
+    if operation == "factorial" and not _is_integral(a):
+        raise ValueError("factorial is only defined for non-negative integers")
+    if operation in INTEGER_OPS and _is_integral(a) and (b is None or _is_integral(b)):
+        return _evaluate_integral(operation, a, b)
+
+    with np.errstate(all="ignore"):
+        if operation in UNARY_OPS:
+            result = UNARY_OPS[operation](np.asarray(a, dtype=np.float64))
+        else:
+            result = BINARY_OPS[operation](np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+
+    result = np.atleast_1d(result)
+    finite = np.isfinite(result)
+    values = result.tolist()
+    # NaN and inf are not valid JSON, report them as null
+    if not finite.all():
+        values = [v if ok else None for v, ok in zip(values, finite.tolist())]
+    return values
+
+
+def _item_cost(operation, a, b) -> float:
+    """Rough work estimate for one batch item, in the units of the scalar tools' costs."""
+    if operation == "factorial" and isinstance(a, int):
+        return a
+    if operation == "power" and isinstance(a, int) and isinstance(b, int) and b > 0:
+        return b * math.log2(abs(a) or 1)
+    return 0
+
+
+def _batch_cost(operation=None, a=None, b=None, operations=None) -> float:
+    if operations is not None:
+        return sum(_item_cost(item.get("op"), item.get("a"), item.get("b")) for item in operations)
+    if operation not in ("factorial", "power") or a is None:
+        return 0
+    b_values = b if isinstance(b, list) else [b] * len(a)
+    return sum(_item_cost(operation, x, y) for x, y in zip(a, b_values))
+
+
+# batch evaluation tool; batches with big factorials or powers run in the
+# CPU pool like the scalar tools do
+@mcp.tool()
+@cpu_bound(cost=_batch_cost, inline_below=20_000, timeout=10)
+def batch_eval(
+    operation: str | None = None,
+    a: list[int | float] | None = None,
+    b: list[int | float] | int | float | None = None,
+    operations: list[dict] | None = None,
+) -> list[int | float | None]:
+    """Evaluate many math operations in one call.
+
+    Either pass `operation` (a tool name such as "add" or "sin") with operand
+    arrays `a` and `b` (b may be a single number), or pass `operations`, a
+    list of {"op": ..., "a": ..., "b": ...} items with mixed operations.
+    Results come back in input order; undefined values (e.g. divide by zero)
+    are null.
+    """
+    if operations is None:
+        if operation is None or a is None:
+            raise ValueError("Pass either 'operation' and 'a', or 'operations'")
+        return _evaluate(operation, a, b)
+
+    # group the heterogeneous items by operation, and by whether the operands
+    # are integers so int items keep int results; evaluate each group in one
+    # vectorised pass and scatter the results back into input order
+    groups: dict[tuple[str, bool], list[int]] = {}
+    for index, item in enumerate(operations):
+        integral = _is_integral(item.get("a")) and _is_integral(item.get("b", 0))
+        groups.setdefault((item["op"], integral), []).append(index)
+
+    results: list = [None] * len(operations)
+    for (op, _), indices in groups.items():
+        a_values = [operations[i]["a"] for i in indices]
+        b_values = None
+        if op in BINARY_OPS:
+            if any("b" not in operations[i] for i in indices):
+                raise ValueError(f"operation '{op}' needs operand 'b'")
+            b_values = [operations[i]["b"] for i in indices]
+        for i, value in zip(indices, _evaluate(op, a_values, b_values)):
+            results[i] = value
+    return results
+
+# EXPRESSION EVALUATION
+
+# functions and constants usable inside expressions, mirroring the tools above
+EXPRESSION_NAMES = {
+    "add": lambda a, b: a + b,
+    "subtract": lambda a, b: a - b,
+    "multiply": lambda a, b: a * b,
+    "divide": lambda a, b: a / b,
+    "power": _safe_power,
+    "remainder": lambda a, b: a % b,
+    "sqrt": math.sqrt,
+    "cbrt": lambda a: math.copysign(abs(a) ** (1 / 3), a),
+    "factorial": _safe_factorial,
+    "log": math.log,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "abs": abs,
+    "pi": math.pi,
+    "e": math.e,
+}
+
+ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load,
+    ast.Constant, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.Pow, ast.UAdd, ast.USub,
+)
+
+
+class _PowerToCall(ast.NodeTransformer):
+    """Rewrite `a ** b` into `power(a, b)` so it goes through the size guard."""
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            call = ast.Call(
+                func=ast.Name(id="power", ctx=ast.Load()),
+                args=[node.left, node.right],
+                keywords=[],
+            )
+            return ast.copy_location(call, node)
+        return node
+
+
+@functools.lru_cache(maxsize=512)
+def compile_expression(expression: str):
+    """Parse, validate and compile an arithmetic expression to a code object."""
+    source = expression.replace("^", "**").replace("\u00d7", "*").replace("\u00f7", "/")
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {expression!r}") from e
+
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise ValueError(f"Unsupported syntax in expression: {type(node).__name__}")
+        if isinstance(node, ast.Constant) and (
+            isinstance(node.value, bool) or not isinstance(node.value, (int, float))
+        ):
+            raise ValueError(f"Unsupported constant in expression: {node.value!r}")
+        if isinstance(node, ast.Name) and node.id not in EXPRESSION_NAMES:
+            raise ValueError(f"Unknown name in expression: {node.id}")
+        if isinstance(node, ast.Call) and (
+            not isinstance(node.func, ast.Name) or node.keywords
+        ):
+            raise ValueError("Only plain calls like sqrt(2) are allowed")
+
+    tree = ast.fix_missing_locations(_PowerToCall().visit(tree))
+    return compile(tree, "<expression>", "eval")
+
+
+# expression evaluation tool, long expressions run in the CPU pool
+@mcp.cached_tool()
+@cpu_bound(cost=lambda expression: len(expression), inline_below=256, timeout=10)
+def evaluate(expression: str) -> int | float | None:
+    """Evaluate a whole arithmetic expression in one call, e.g. "(3 + 5) * 12".
+
+    Supports + - * / // % ** (or ^), parentheses, the constants pi and e, and
+    the functions add, subtract, multiply, divide, power, remainder, sqrt,
+    cbrt, factorial, log, sin, cos, tan and abs. Results that are not finite
+    (e.g. 1e308 * 10) are null.
+    """
+    code = compile_expression(expression)
+    result = eval(code, {"__builtins__": {}}, EXPRESSION_NAMES)
+    if isinstance(result, float) and not math.isfinite(result):
+        return None
+    return _check_int(result)
+
+# ARRAY MATH
+# arrays are passed as ArrayPayload (base64 buffer + dtype + shape), see array_codec.py
+
+# Result shapes are worked out from the payload shapes before numpy runs, so
+# an output far larger than the inputs (matmul of [N,1] by [1,N]) is refused
+# instead of allocated; heavy calls run in the CPU pool.
+
+def _result_shape(shape: tuple[int, ...]) -> tuple[int, ...]:
+    if math.prod(shape) > MAX_ELEMENTS:
+        raise ValueError(f"Result too large: shape {list(shape)} (max {MAX_ELEMENTS} elements)")
+    return shape
+
+
+def _matmul_shape(a: list[int], b: list[int]) -> tuple[int, ...]:
+    if not a or not b:
+        raise ValueError("matmul needs arrays of at least one dimension")
+    a_vector, b_vector = len(a) == 1, len(b) == 1
+    a = [1, *a] if a_vector else list(a)
+    b = [*b, 1] if b_vector else list(b)
+    if a[-1] != b[-2]:
+        raise ValueError(f"matmul shape mismatch: {a[-1]} vs {b[-2]}")
+    shape = [*np.broadcast_shapes(tuple(a[:-2]), tuple(b[:-2])), a[-2], b[-1]]
+    if b_vector:
+        del shape[-1]
+    if a_vector:
+        del shape[-2 if not b_vector else -1]
+    return _result_shape(tuple(shape))
+
+
+def _dot_shape(a: list[int], b: list[int]) -> tuple[int, ...]:
+    if not a or not b:
+        # a scalar operand multiplies elementwise
+        return tuple(a or b)
+    inner = b[0] if len(b) == 1 else b[-2]
+    if a[-1] != inner:
+        raise ValueError(f"dot shape mismatch: {a[-1]} vs {inner}")
+    return _result_shape((*a[:-1], *b[:-2], *b[-1:]) if len(b) > 1 else tuple(a[:-1]))
+
+
+def _product_cost(shape: tuple[int, ...], a: ArrayPayload) -> float:
+    # multiply-adds: one per output element per inner-dimension step
+    return math.prod(shape) * (a.shape[-1] if a.shape else 1)
+
+
+def _elements(a: ArrayPayload, *args, **kwargs) -> float:
+    return math.prod(a.shape)
+
+
+# dot product tool
+@mcp.tool()
+@cpu_bound(cost=lambda a, b: _product_cost(_dot_shape(a.shape, b.shape), a), inline_below=1_000_000, timeout=30)
+def dot(a: ArrayPayload, b: ArrayPayload) -> ArrayPayload:
+    """Dot product of two arrays (shape [] result for two vectors)"""
+    _dot_shape(a.shape, b.shape)
+    return encode_array(np.dot(decode_array(a), decode_array(b)))
+
+# matrix multiplication tool
+@mcp.tool()
+@cpu_bound(cost=lambda a, b: _product_cost(_matmul_shape(a.shape, b.shape), a), inline_below=1_000_000, timeout=30)
+def matmul(a: ArrayPayload, b: ArrayPayload) -> ArrayPayload:
+    """Matrix product of two arrays"""
+    _matmul_shape(a.shape, b.shape)
+    return encode_array(np.matmul(decode_array(a), decode_array(b)))
+
+# array statistics tool
+@mcp.tool()
+@cpu_bound(cost=_elements, inline_below=1_000_000, timeout=30)
+def array_stats(a: ArrayPayload, axis: int | None = None) -> dict[str, float | ArrayPayload]:
+    """count, sum, mean, std, min, median and max of an array.
+
+    Over the whole array by default, values are then plain numbers; with
+    `axis` each statistic is an array.
+    """
+    array = decode_array(a)
+    if array.size == 0:
+        raise ValueError("Statistics of an empty array are undefined")
+    stats = {
+        "sum": np.sum(array, axis=axis),
+        "mean": np.mean(array, axis=axis),
+        "std": np.std(array, axis=axis),
+        "min": np.min(array, axis=axis),
+        "median": np.median(array, axis=axis),
+        "max": np.max(array, axis=axis),
+    }
+    count = array.size if axis is None else array.shape[axis]
+    if axis is None:
+        return {"count": float(count), **{name: float(value) for name, value in stats.items()}}
+    return {"count": float(count), **{name: encode_array(value) for name, value in stats.items()}}
+
+# percentile tool
+@mcp.tool()
+@cpu_bound(cost=_elements, inline_below=1_000_000, timeout=30)
+def percentile(a: ArrayPayload, q: list[float], axis: int | None = None) -> ArrayPayload:
+    """Percentiles q (0-100) of an array, one row per entry of q"""
+    return encode_array(np.percentile(decode_array(a), q, axis=axis))
+
 # DEFINE RESOURCES
 
 # Add a dynamic greeting resource
-@mcp.resource("greeting://{name}")
+@mcp.cached_resource("greeting://{name}")
 def get_greeting(name: str) -> str:
     """Get a personalized greeting"""
     return f"Hello, {name}!"
+
+# cache hit/miss/eviction counters
+@mcp.resource("cache://stats")
+def get_cache_stats() -> dict:
+    """Result cache statistics for the cached tools and resources"""
+    return mcp.cache_stats()
+
+# event loop lag percentiles and recent stalls with stacks
+@mcp.resource("debug://loop")
+def get_loop_stats() -> dict:
+    """Event loop lag and recent stalls of this server"""
+    return monitor.snapshot()
     
  
  # execute and return the stdio output
@@ -0,0 +1,377 @@
+"""Keep warm, pre-initialised stdio MCP servers ready for clients.
+
+Spawning `python math_server.py` or `npx -y @executeautomation/playwright-mcp-server`
+costs seconds of interpreter / npm startup every time a client session opens.
+The supervisor starts those processes ahead of time, runs the MCP handshake
+once to know they are ready, and hands one to each client that connects on a
+Unix socket. A handed-out process serves exactly one session and is killed
+afterwards, while a replacement is already warming up in the background.
+Idle processes are recycled once they get too old or stop answering pings.
+
+    python mcp_supervisor.py serve            # run the supervisor
+    python mcp_supervisor.py connect math     # stdio shim, use as the client "command"
+
+`stdio_config("math")` builds the MultiServerMCPClient entry for a server,
+going through the supervisor when it is running and spawning directly if not.
+"""
+
+import argparse
+import asyncio
+import collections
+import contextlib
+import itertools
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# The stdio servers we keep warm, keyed by the name clients ask for.
+SERVERS = {
+    "math": {
+        "command": sys.executable,
+        "args": [str(BASE_DIR / "math_server.py")],
+        "pool_size": 2,
+    },
+    "play": {
+        "command": "npx",
+        "args": ["-y", "@executeautomation/playwright-mcp-server"],
+        "pool_size": 1,
+    },
+}
+
+SOCKET_PATH = os.environ.get(
+    "MCP_SUPERVISOR_SOCKET",
+    os.path.join(os.environ.get("XDG_RUNTIME_DIR", "/tmp"), f"mcp-supervisor-{os.getuid()}.sock"),
+)
+PROTOCOL_VERSION = "2025-06-18"
+MAX_AGE = 15 * 60          # recycle idle processes older than this (seconds)
+HEALTH_INTERVAL = 30       # ping idle processes this often (seconds)
+HANDSHAKE_TIMEOUT = 60     # npx may have to download the package first
+PING_TIMEOUT = 5
+STREAM_LIMIT = 16 * 1024 * 1024  # tool catalogs can be large JSON lines
+
+_request_ids = itertools.count(1)
+
+
+class WarmProcess:
+    """One pre-started, initialised stdio server process."""
+
+    def __init__(self, name: str, proc: asyncio.subprocess.Process):
+        self.name = name
+        self.proc = proc
+        self.started_at = time.monotonic()
+
+    @classmethod
+    async def start(cls, name: str, spec: dict) -> "WarmProcess":
+        proc = await asyncio.create_subprocess_exec(
+            spec["command"], *spec.get("args", []),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=spec.get("cwd", BASE_DIR),
+            env={**os.environ, **spec.get("env", {})},
+            limit=STREAM_LIMIT,
+            # own process group so npx and the node child it starts die together
+            start_new_session=True,
+        )
+        warm = cls(name, proc)
+        try:
+            await asyncio.wait_for(
+                warm.request("initialize", {
+                    "protocolVersion": PROTOCOL_VERSION,
+                    "capabilities": {},
+                    "clientInfo": {"name": "mcp-supervisor", "version": "1.0"},
+                }),
+                HANDSHAKE_TIMEOUT,
+            )
+            await warm.send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+        except BaseException:
+            await warm.kill()
+            raise
+        logger.info("Warmed %s (pid %s)", name, proc.pid)
+        return warm
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.returncode is None
+
+    async def send(self, message: dict) -> None:
+        self.proc.stdin.write(json.dumps(message).encode() + b"\n")
+        await self.proc.stdin.drain()
+
+    async def request(self, method: str, params: dict | None = None) -> dict:
+        """Send a request on the private warm-up channel and wait for its response."""
+        request_id = f"supervisor-{next(_request_ids)}"
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        await self.send(message)
+        while True:
+            line = await self.proc.stdout.readline()
+            if not line:
+                raise ConnectionError(f"{self.name} exited during {method}")
+            try:
+                response = json.loads(line)
+            except ValueError:
+                continue  # stray output on stdout, not a protocol message
+            if response.get("id") == request_id:
+                if "error" in response:
+                    raise ConnectionError(f"{self.name} {method} failed: {response['error']}")
+                return response.get("result", {})
+
+    async def healthy(self) -> bool:
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.request("ping"), PING_TIMEOUT)
+            return True
+        except (asyncio.TimeoutError, ConnectionError, OSError):
+            return False
+
+    async def kill(self) -> None:
+        if self.alive:
+            try:
+                os.killpg(self.proc.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            try:
+                await asyncio.wait_for(self.proc.wait(), 5)
+            except asyncio.TimeoutError:
+                os.killpg(self.proc.pid, signal.SIGKILL)
+                await self.proc.wait()
+
+
+class ServerPool:
+    """Idle warm processes for one server, topped up in the background."""
+
+    def __init__(self, name: str, spec: dict):
+        self.name = name
+        self.spec = spec
+        self.size = spec.get("pool_size", 1)
+        self.idle: collections.deque[WarmProcess] = collections.deque()
+        self.starting = 0
+        self._tasks: set[asyncio.Task] = set()
+        self.stats = {"handed_out": 0, "cold_starts": 0, "recycled": 0, "failed_starts": 0}
+
+    def replenish(self) -> None:
+        for _ in range(self.size - len(self.idle) - self.starting):
+            self.starting += 1
+            task = asyncio.create_task(self._start_one())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _start_one(self) -> None:
+        try:
+            self.idle.append(await WarmProcess.start(self.name, self.spec))
+        except Exception as e:
+            self.stats["failed_starts"] += 1
+            logger.error("Failed to start %s: %s", self.name, e)
+        finally:
+            self.starting -= 1
+
+    async def acquire(self) -> WarmProcess:
+        while self.idle:
+            warm = self.idle.popleft()
+            if warm.alive:
+                self.replenish()
+                self.stats["handed_out"] += 1
+                return warm
+        # pool ran dry, the client pays for one cold start
+        self.replenish()
+        self.stats["cold_starts"] += 1
+        return await WarmProcess.start(self.name, self.spec)
+
+    async def maintain(self) -> None:
+        """Drop idle processes that are too old or fail a ping, then top up."""
+        for _ in range(len(self.idle)):
+            warm = self.idle.popleft()
+            if warm.age < MAX_AGE and await warm.healthy():
+                self.idle.append(warm)
+            else:
+                self.stats["recycled"] += 1
+                await warm.kill()
+        self.replenish()
+
+    async def close(self) -> None:
+        while self.idle:
+            await self.idle.popleft().kill()
+
+
+async def _pump(reader: asyncio.StreamReader, writer) -> None:
+    try:
+        while chunk := await reader.read(65536):
+            writer.write(chunk)
+            await writer.drain()
+    except (ConnectionError, BrokenPipeError):
+        pass
+    finally:
+        try:
+            writer.close()
+        except (ConnectionError, BrokenPipeError):
+            pass
+
+
+class Supervisor:
+    def __init__(self, servers: dict = SERVERS, socket_path: str = SOCKET_PATH):
+        self.pools = {name: ServerPool(name, spec) for name, spec in servers.items()}
+        self.socket_path = socket_path
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """First line names the server; after the reply the socket is a raw stdio pipe."""
+        try:
+            line = await reader.readline()
+            if not line:
+                # a liveness probe (see supervisor_running) hung up
+                writer.close()
+                return
+            hello = json.loads(line)
+            name = hello.get("server")
+            if name == "stats":
+                writer.write(json.dumps(self.stats()).encode() + b"\n")
+                writer.close()
+                return
+            if name not in self.pools:
+                raise KeyError(f"Unknown server: {name}")
+            warm = await self.pools[name].acquire()
+        except Exception as e:
+            logger.error("Rejected client: %s", e)
+            writer.write(json.dumps({"ok": False, "error": str(e).strip("'")}).encode() + b"\n")
+            writer.close()
+            return
+
+        writer.write(b'{"ok": true}\n')
+        # The client runs its own initialize on the warm process: a server
+        # accepts a repeated initialize, and this way it sees the real client's
+        # protocol version and capabilities instead of the warm-up ones.
+        tasks = [
+            asyncio.create_task(_pump(reader, warm.proc.stdin)),
+            asyncio.create_task(_pump(warm.proc.stdout, writer)),
+        ]
+        try:
+            # the session is over as soon as either side hangs up
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await warm.kill()
+            writer.close()
+
+    async def maintain(self) -> None:
+        while True:
+            await asyncio.sleep(HEALTH_INTERVAL)
+            for pool in self.pools.values():
+                await pool.maintain()
+
+    def stats(self) -> dict:
+        return {
+            name: {"idle": len(pool.idle), "starting": pool.starting, **pool.stats}
+            for name, pool in self.pools.items()
+        }
+
+    async def serve(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self.handle_client, self.socket_path, limit=STREAM_LIMIT)
+        os.chmod(self.socket_path, 0o600)
+        for pool in self.pools.values():
+            pool.replenish()
+        logger.info("Supervisor listening on %s", self.socket_path)
+        maintenance = asyncio.create_task(self.maintain())
+        # SIGTERM would otherwise end the process without running the cleanup
+        # below, leaving a dead socket file behind for clients to trip over
+        stop = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        try:
+            async with server:
+                await server.start_serving()
+                await stop.wait()
+        finally:
+            maintenance.cancel()
+            for pool in self.pools.values():
+                await pool.close()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.socket_path)
+
+
+async def connect(name: str, socket_path: str = SOCKET_PATH) -> int:
+    """Bridge this process's stdin/stdout to a warm server from the supervisor."""
+    reader, writer = await asyncio.open_unix_connection(socket_path, limit=STREAM_LIMIT)
+    writer.write(json.dumps({"server": name}).encode() + b"\n")
+    reply = json.loads(await reader.readline() or b"{}")
+    if not reply.get("ok"):
+        print(f"mcp-supervisor: {reply.get('error', 'no reply')}", file=sys.stderr)
+        return 1
+
+    loop = asyncio.get_running_loop()
+    stdin = asyncio.StreamReader(limit=STREAM_LIMIT)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(stdin), sys.stdin)
+    transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, sys.stdout)
+    stdout = asyncio.StreamWriter(transport, protocol, None, loop)
+
+    # the session is over as soon as either side hangs up
+    tasks = [asyncio.create_task(_pump(stdin, writer)), asyncio.create_task(_pump(reader, stdout))]
+    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    for task in tasks:
+        task.cancel()
+    return 0
+
+
+def supervisor_running(socket_path: str = SOCKET_PATH, timeout: float = 0.5) -> bool:
+    """True if a supervisor accepts connections on `socket_path`.
+
+    The socket file alone proves nothing: a supervisor killed with SIGKILL
+    leaves it behind, and connecting to it fails.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        probe.settimeout(timeout)
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def stdio_config(name: str) -> dict:
+    """MultiServerMCPClient config for a server, pooled when the supervisor is up."""
+    if supervisor_running():
+        return {
+            "command": sys.executable,
+            "args": [os.path.abspath(__file__), "connect", name],
+            "transport": "stdio",
+        }
+    spec = SERVERS[name]
+    return {"command": spec["command"], "args": spec["args"], "transport": "stdio"}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Unix socket path")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("serve", help="run the supervisor")
+    connect_parser = sub.add_parser("connect", help="stdio shim for an MCP client")
+    connect_parser.add_argument("server", choices=sorted(SERVERS))
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        logging.basicConfig(level=logging.INFO)
+        try:
+            asyncio.run(Supervisor(socket_path=args.socket).serve())
+        except KeyboardInterrupt:
+            pass
+        return 0
+    return asyncio.run(connect(args.server, args.socket))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
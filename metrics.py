@@ -0,0 +1,329 @@
+"""In-process metrics with a Prometheus text endpoint.
+
+Counters, gauges and fixed-bucket histograms, each with optional labels.
+Updates are plain attribute/list writes with no locks: every update happens
+on the server's single event loop thread. Each worker process (see
+launcher.py) keeps its own registry, and Prometheus sums them per instance.
+
+Recorded here:
+- MCP requests per method: latency, in-flight, errors (`MCPMetricsMiddleware`)
+- tool calls per tool: latency, in-flight, errors (`MCPMetricsMiddleware`)
+- HTTP request/response payload sizes and in-flight requests (`HTTPMetricsMiddleware`),
+  labelled with the matched route template (`/jobs/{id}`), never the raw path
+- HTTP latency, for apps that already time requests (`HTTP_DURATION`)
+
+    first_mcp.add_middleware(MCPMetricsMiddleware())
+
+    @first_mcp.custom_route("/metrics", methods=["GET"])
+    async def metrics_route(request):
+        return metrics_response()
+"""
+
+import time
+from bisect import bisect_left
+from typing import Iterable
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from starlette.responses import Response
+from starlette.routing import Match, Mount
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# label sets past this many per metric are folded into "other"
+MAX_SERIES = 500
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        # one slot per bucket plus +Inf; cumulated only when rendering
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(self._children) >= MAX_SERIES:
+                key = ("other",) * len(self.labelnames)
+                child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+        return child
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in self._children.items():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {child.value!r}"
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._children[()].inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._children[()].set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, n in zip(child.bounds + (float("inf"),), child.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames, values, f'le="{le}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {child.sum!r}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+MCP_REQUEST_DURATION = REGISTRY.histogram(
+    "mcp_request_duration_seconds", "MCP request latency by method.", ["method"])
+MCP_REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "mcp_requests_in_flight", "MCP requests currently being handled.", ["method"])
+MCP_REQUEST_ERRORS = REGISTRY.counter(
+    "mcp_request_errors_total", "MCP requests that raised, by method and exception type.", ["method", "error"])
+MCP_TOOL_DURATION = REGISTRY.histogram(
+    "mcp_tool_duration_seconds", "Tool call latency by tool.", ["tool"])
+MCP_TOOLS_IN_FLIGHT = REGISTRY.gauge(
+    "mcp_tool_calls_in_flight", "Tool calls currently running, by tool.", ["tool"])
+MCP_TOOL_ERRORS = REGISTRY.counter(
+    "mcp_tool_errors_total", "Tool calls that raised, by tool and exception type.", ["tool", "error"])
+
+HTTP_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ["method", "path", "status"])
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled.")
+HTTP_REQUEST_SIZE = REGISTRY.histogram(
+    "http_request_size_bytes", "HTTP request body size.", ["method", "path"], SIZE_BUCKETS)
+HTTP_RESPONSE_SIZE = REGISTRY.histogram(
+    "http_response_size_bytes", "HTTP response body size.", ["method", "path", "status"], SIZE_BUCKETS)
+
+
+def metrics_response() -> Response:
+    """The registry in Prometheus text format, for a `/metrics` route."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+class MCPMetricsMiddleware(Middleware):
+    """Latency, in-flight and error metrics per MCP method and per tool."""
+
+    async def on_request(self, context: MiddlewareContext, call_next):
+        method = context.method
+        in_flight = MCP_REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            return await call_next(context)
+        except Exception as e:
+            MCP_REQUEST_ERRORS.labels(method, type(e).__name__).inc()
+            raise
+        finally:
+            MCP_REQUEST_DURATION.labels(method).observe(time.perf_counter() - start)
+            in_flight.dec()
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        tool = context.message.name
+        in_flight = MCP_TOOLS_IN_FLIGHT.labels(tool)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            return await call_next(context)
+        except Exception as e:
+            MCP_TOOL_ERRORS.labels(tool, type(e).__name__).inc()
+            raise
+        finally:
+            MCP_TOOL_DURATION.labels(tool).observe(time.perf_counter() - start)
+            in_flight.dec()
+
+
+UNMATCHED = "unmatched"
+
+
+def _match_route(routes, scope) -> str | None:
+    partial = None
+    for route in routes:
+        match, child_scope = route.matches(scope)
+        if match is Match.NONE:
+            continue
+        if isinstance(route, Mount) and route.routes:
+            # the template of the route inside the mount, under its prefix
+            inner = _match_route(route.routes, {**scope, **child_scope})
+            label = None if inner is None else route.path + inner
+        else:
+            label = route.path or "/"
+        if match is Match.FULL and label is not None:
+            return label
+        # wrong method: keep looking, as the router does, but label by the template
+        partial = partial or label
+    return partial
+
+
+def route_label(scope) -> str:
+    """The route template the request matches in the app, or `"unmatched"`.
+
+    Raw paths would give one label set per job id, file name, ...
+    """
+    routes = getattr(scope.get("app"), "routes", None)
+    if not routes:
+        return UNMATCHED
+    return _match_route(routes, scope) or UNMATCHED
+
+
+class HTTPMetricsMiddleware:
+    """ASGI middleware recording request/response body sizes and in-flight requests.
+
+    Sizes are counted from the body chunks as they stream through, so
+    SSE responses are measured without buffering them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        received = 0
+        sent = 0
+        status = 0
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal sent, status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        # before dispatching: routing rewrites root_path/app in the scope
+        path = route_label(scope)
+        HTTP_IN_FLIGHT.labels().inc()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            HTTP_IN_FLIGHT.labels().dec()
+            HTTP_REQUEST_SIZE.labels(scope["method"], path).observe(received)
+            HTTP_RESPONSE_SIZE.labels(scope["method"], path, status or 500).observe(sent)
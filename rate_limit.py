@@ -0,0 +1,177 @@
+"""Per-token rate limiting for the bearer-auth middleware.
+
+Token buckets keyed by (role, token): each role has a `Policy` with a
+sustained rate and a burst size. Checking a request costs one dict lookup
+and a little arithmetic. Tokens are hashed before use as keys, so raw
+credentials are never kept.
+
+- `InMemoryRateLimiter` enforces limits per process. Buckets that have
+  refilled completely hold no information and are dropped by a periodic
+  compaction pass, which keeps memory bounded by the number of recently
+  active tokens.
+- `RedisRateLimiter` keeps the buckets in Redis (an atomic Lua script, with
+  Redis' clock) so every worker enforces one global limit. It needs the
+  optional `redis` package and falls back to the in-memory limiter if Redis
+  is unreachable.
+
+`build_rate_limiter()` picks Redis when RATE_LIMIT_REDIS_URL is set.
+`Decision.headers()` gives the RateLimit-Limit / RateLimit-Remaining /
+RateLimit-Reset headers (plus Retry-After when limited).
+"""
+
+import hashlib
+import math
+import os
+import time
+from dataclasses import dataclass
+
+from structured_log import get_logger
+
+log = get_logger("rate_limit")
+
+
+@dataclass(frozen=True)
+class Policy:
+    # sustained requests per second
+    rate: float
+    # requests allowed back to back after being idle
+    burst: int
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    limit: int
+    remaining: int
+    # seconds until the bucket is full again
+    reset: float
+    # seconds until the next request would be allowed (0 when allowed)
+    retry_after: float = 0.0
+
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+def _decide(policy: Policy, tokens: float, allowed: bool) -> Decision:
+    return Decision(
+        allowed=allowed,
+        limit=policy.burst,
+        remaining=int(tokens),
+        reset=(policy.burst - tokens) / policy.rate,
+        retry_after=0.0 if allowed else (1 - tokens) / policy.rate,
+    )
+
+
+def token_key(token: str, role: str) -> str:
+    return f"{role}:{hashlib.blake2b(token.encode(), digest_size=16).hexdigest()}"
+
+
+class InMemoryRateLimiter:
+    def __init__(self, policies: dict[str, Policy], default: Policy, compact_every: float = 60.0):
+        self.policies = policies
+        self.default = default
+        self.compact_every = compact_every
+        # key -> [tokens, last refill (monotonic)]
+        self._buckets: dict[str, list[float]] = {}
+        self._next_compaction = time.monotonic() + compact_every
+
+    def policy(self, role: str) -> Policy:
+        return self.policies.get(role, self.default)
+
+    def check_now(self, token: str, role: str, cost: float = 1.0) -> Decision:
+        policy = self.policy(role)
+        key = token_key(token, role)
+        now = time.monotonic()
+        if now >= self._next_compaction:
+            self.compact(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(policy.burst), now]
+        else:
+            bucket[0] = min(policy.burst, bucket[0] + (now - bucket[1]) * policy.rate)
+            bucket[1] = now
+        allowed = bucket[0] >= cost
+        if allowed:
+            bucket[0] -= cost
+        return _decide(policy, bucket[0], allowed)
+
+    async def check(self, token: str, role: str, cost: float = 1.0) -> Decision:
+        return self.check_now(token, role, cost)
+
+    def compact(self, now: float | None = None) -> int:
+        """Drop buckets that have refilled completely; returns how many."""
+        now = time.monotonic() if now is None else now
+        full = []
+        for key, (tokens, last) in self._buckets.items():
+            policy = self.policy(key.partition(":")[0])
+            if tokens + (now - last) * policy.rate >= policy.burst:
+                full.append(key)
+        for key in full:
+            del self._buckets[key]
+        self._next_compaction = now + self.compact_every
+        return len(full)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# KEYS[1] bucket; ARGV rate, burst, cost. Returns {allowed, tokens as string}.
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisRateLimiter:
+    """Token buckets shared by all workers through Redis."""
+
+    def __init__(self, url: str, policies: dict[str, Policy], default: Policy, prefix: str = "ratelimit:"):
+        import redis.asyncio as redis  # optional dependency
+
+        self.client = redis.from_url(url)
+        self.policies = policies
+        self.default = default
+        self.prefix = prefix
+        self._script = self.client.register_script(_TOKEN_BUCKET_LUA)
+        # used while Redis is unreachable
+        self.fallback = InMemoryRateLimiter(policies, default)
+
+    async def check(self, token: str, role: str, cost: float = 1.0) -> Decision:
+        policy = self.policies.get(role, self.default)
+        key = self.prefix + token_key(token, role)
+        try:
+            allowed, tokens = await self._script(keys=[key], args=[policy.rate, policy.burst, cost])
+        except Exception as e:
+            log.warning("Rate limit store unavailable, limiting per process", extra={"error": repr(e)})
+            return self.fallback.check_now(token, role, cost)
+        return _decide(policy, float(tokens), bool(allowed))
+
+
+def build_rate_limiter(policies: dict[str, Policy], default: Policy, redis_url: str | None = None):
+    """Redis-backed limiter if a URL is given (or RATE_LIMIT_REDIS_URL is set), else in-memory."""
+    redis_url = redis_url or os.environ.get("RATE_LIMIT_REDIS_URL")
+    if redis_url:
+        return RedisRateLimiter(redis_url, policies, default)
+    return InMemoryRateLimiter(policies, default)
@@ -1,14 +1,19 @@
-from fastmcp import FastMCP
+from catalog_cache import CatalogFastMCP
 from starlette.requests import Request
 from starlette.responses import JSONResponse
+from loop_monitor import LoopMonitorMiddleware, debug_loop_route
 
 # Create a basic server instance
-sec_mcp = FastMCP(name="MyAssistantServer 2")
+# mounted in the gateway, whose cached listing must see its tool changes
+sec_mcp = CatalogFastMCP(name="MyAssistantServer 2")
+sec_mcp.add_middleware(LoopMonitorMiddleware())
 
 @sec_mcp.custom_route("/health", methods=["GET"])
 async def health_check(request: Request):
     return JSONResponse({"status": "healthy"})
 
+sec_mcp.custom_route("/debug/loop", methods=["GET"])(debug_loop_route)
+
 @sec_mcp.tool()
 def mul(a: int, b: int) -> int:
     """Adds two integer numbers together."""
@@ -1,13 +1,19 @@
-from fastmcp import FastMCP
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 from starlette.middleware import Middleware
 from starlette.middleware.cors import CORSMiddleware
 from starlette.applications import Starlette
-from starlette.routing import Mount
+from starlette.routing import Mount, Route
 from contextlib import asynccontextmanager
-from first_mcp import first_mcp_app
-from sec_mcp import sec_mcp_app
+from first_file_mcp import first_mcp, first_mcp_app
+from sec_file_mcp import sec_mcp, sec_mcp_app
+from gateway import build_gateway
+from loop_monitor import debug_loop_route, monitor
+from http_compression import CompressionMiddleware
+import argparse
+import logging
+import os
+import launcher
 import uvicorn
 
 # Define custom middleware
@@ -17,25 +23,53 @@ custom_middleware = [
         allow_origins=["*"],
         allow_methods=["*"],
         allow_headers=["*"],
-    )
+    ),
+    # gzip/br/zstd by Accept-Encoding; SSE streams are flushed per event
+    Middleware(CompressionMiddleware, minimum_size=1024),
 ]
 
+# Single /mcp endpoint serving both servers' tools, namespaced as first_* and sec_*
+gateway = build_gateway({"first": first_mcp, "sec": sec_mcp})
+gateway_app = gateway.http_app(path="/mcp", stateless_http=True, transport="streamable-http")
+
 @asynccontextmanager
 async def app_lifespan(app):
-    async with first_mcp_app.lifespan(app):
+    # one monitor per worker process, watching this worker's loop
+    async with monitor.lifespan(app), first_mcp_app.lifespan(app):
         async with sec_mcp_app.lifespan(app):
-            yield
+            async with gateway_app.lifespan(app):
+                yield
+
+async def workers_health(request: Request):
+    return JSONResponse(launcher.worker_health())
 
 # Create a Starlette app and mount the MCP server
 app = Starlette(
-    debug=True,
+    # the production launcher turns tracebacks-in-responses off
+    debug=os.environ.get("MCP_DEBUG", "1") == "1",
     routes=[
+        Route("/health/workers", workers_health, methods=["GET"]),
+        Route("/debug/loop", debug_loop_route, methods=["GET"]),
         Mount("/first_mcp", app=first_mcp_app),
         Mount("/sec_mcp", app=sec_mcp_app),
+        # last, it matches every path not claimed above (serves /mcp)
+        Mount("", app=gateway_app),
     ],
     middleware=custom_middleware,
     lifespan=app_lifespan
 )
 
 if __name__ == "__main__":
-    uvicorn.run("server:app", host='0.0.0.0', port=8010, reload=True)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=0,
+                        help="run N worker processes (production); 0 runs one reloading dev server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8010)
+    args = parser.parse_args()
+
+    if args.workers:
+        # workers are spawned and inherit this before importing the app
+        os.environ["MCP_DEBUG"] = "0"
+        logging.basicConfig(level=logging.INFO)
+        raise SystemExit(launcher.serve("server_1_2_mcp:app", host=args.host, port=args.port, workers=args.workers))
+    uvicorn.run("server_1_2_mcp:app", host=args.host, port=args.port, reload=True)
@@ -0,0 +1,118 @@
+"""Request coalescing (single-flight) for identical concurrent tool calls.
+
+When several sessions make the same idempotent call at once, only the
+first one (the leader) executes it. The others wait for the leader's
+result and get a copy of it, success or error. Nothing is cached: once the
+flight lands, the next call executes again.
+
+`SingleFlight` is the bare group and works with any coroutine:
+
+    profile = await flights.do(key, fetch_profile)
+
+`SingleFlightMiddleware` applies it to fastmcp tools/call. A tool takes
+part when it declares idempotentHint=True, is tagged "idempotent", or is
+named in `tools=`. The key is the tool name plus the canonical arguments
+plus a hash of the caller's Authorization header. So two callers share a
+flight only if their calls are identical and they are the same principal.
+
+Leaders and shared (suppressed) calls are counted in
+`mcp_singleflight_calls_total`.
+"""
+
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable
+
+from fastmcp import FastMCP
+from fastmcp.server.dependencies import get_http_headers
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+
+import catalog_cache
+from metrics import REGISTRY
+from tool_cache import canonical_key
+
+SINGLEFLIGHT_CALLS = REGISTRY.counter(
+    "mcp_singleflight_calls_total", "Coalescable calls, by name and whether they led or shared a flight.",
+    ["name", "role"])
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one execution."""
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self._flights: dict[str, asyncio.Task] = {}
+        # label -> [leaders, shared]
+        self.counts: dict[str, list[int]] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], label: str | None = None) -> Any:
+        """Run `fn()` unless a call with `key` is in flight; either way return its result."""
+        label = label or self.name
+        counts = self.counts.setdefault(label, [0, 0])
+        task = self._flights.get(key)
+        if task is None:
+            counts[0] += 1
+            SINGLEFLIGHT_CALLS.labels(label, "leader").inc()
+            # a task of its own, so one caller going away doesn't cancel the others
+            task = self._flights[key] = asyncio.get_running_loop().create_task(fn())
+            task.add_done_callback(lambda _: self._flights.pop(key, None))
+        else:
+            counts[1] += 1
+            SINGLEFLIGHT_CALLS.labels(label, "shared").inc()
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        leaders = sum(led for led, _ in self.counts.values())
+        shared = sum(shared for _, shared in self.counts.values())
+        return {
+            "leaders": leaders,
+            "shared": shared,
+            "in_flight": len(self._flights),
+            "by_label": {label: {"leaders": led, "shared": shared} for label, (led, shared) in self.counts.items()},
+        }
+
+
+def principal(authorization: str | None) -> str:
+    """An opaque per-credential key component; raw credentials are never kept."""
+    if not authorization:
+        return "-"
+    return hashlib.blake2b(authorization.encode(), digest_size=16).hexdigest()
+
+
+def is_idempotent(tool) -> bool:
+    annotations = tool.annotations
+    return bool(annotations is not None and annotations.idempotentHint) or "idempotent" in tool.tags
+
+
+class SingleFlightMiddleware(Middleware):
+    """Coalesce identical concurrent calls to idempotent tools."""
+
+    def __init__(self, server: FastMCP, tools: set[str] | None = None):
+        self.server = server
+        self.tools = set(tools or ())
+        self.flights = SingleFlight("tools/call")
+        # coalescable tool names, rebuilt when the tool set changes
+        self._eligible: frozenset[str] = frozenset()
+        self._generation: int | None = None
+
+    async def _is_eligible(self, name: str) -> bool:
+        if name in self.tools:
+            return True
+        if self._generation != catalog_cache.generation():
+            generation = catalog_cache.generation()
+            tools = await self.server.get_tools()
+            self._eligible = frozenset(key for key, tool in tools.items() if is_idempotent(tool))
+            self._generation = generation
+        return name in self._eligible
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        name = context.message.name
+        if not await self._is_eligible(name):
+            return await call_next(context)
+        authorization = get_http_headers(include_all=True).get("authorization")
+        key = principal(authorization) + "\0" + canonical_key(name, context.message.arguments)
+        return await self.flights.do(key, lambda: call_next(context), label=name)
+
+    def stats(self) -> dict:
+        """Leaders and shared calls overall and per tool."""
+        return self.flights.stats()
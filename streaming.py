@@ -0,0 +1,109 @@
+"""Incremental results and progress for long-running tools.
+
+Write the tool as an async generator and decorate it with `@streaming_tool`
+(under the server's `@tool()` decorator). The generator needs a Context
+parameter, from either the mcp SDK or fastmcp. While it runs, every yield
+reaches the client as a notification on the request's SSE stream, so the
+client sees output long before the tool finishes.
+
+- `yield Progress(done, total, message)` sends notifications/progress. Only
+  clients that asked for progress (sent a progressToken) get these.
+- Any other yielded value is a partial result. It goes out as a
+  notifications/message with logger "partial/<tool>" and the value as
+  `data`.
+- `yield Result(value)` sets the final tools/call result. Without one, the
+  result is the list of partials.
+
+    @app.tool()
+    @streaming_tool(returns=dict[str, Any])
+    async def build_report(ctx: Context) -> AsyncIterator[Any]:
+        yield Progress(0, 2, "Fetching")
+        rows = await fetch()
+        yield rows[:10]                 # first rows reach the client now
+        yield Progress(1, 2, "Summarising")
+        yield Result({"rows": len(rows), "summary": summarise(rows)})
+
+Notifications ride the per-request SSE response. A streamable-http server
+started with json_response=True buffers the whole reply instead and drops
+them.
+"""
+
+import inspect
+import time
+from contextlib import aclosing
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any
+
+
+@dataclass(frozen=True)
+class Progress:
+    progress: float
+    total: float | None = None
+    message: str | None = None
+
+
+@dataclass(frozen=True)
+class Result:
+    value: Any
+
+
+def _context_parameter(signature: inspect.Signature) -> str:
+    for parameter in signature.parameters.values():
+        if inspect.isclass(parameter.annotation) and hasattr(parameter.annotation, "report_progress"):
+            return parameter.name
+    raise TypeError("streaming tools need a Context parameter")
+
+
+def streaming_tool(func=None, *, returns: Any = inspect.Signature.empty, min_interval: float = 0.05):
+    """Turn an async-generator tool into one that streams partials and progress.
+
+    `returns` is the annotation for the final result (it drives the tool's
+    output schema). `Progress` updates that arrive less than `min_interval`
+    seconds after the last one are dropped, apart from the final update.
+    Partial results are never dropped.
+    """
+
+    def decorate(func):
+        if not inspect.isasyncgenfunction(func):
+            raise TypeError(f"{func.__name__} must be an async generator function")
+        signature = inspect.signature(func)
+        ctx_name = _context_parameter(signature)
+        logger = f"partial/{func.__name__}"
+
+        @wraps(func)
+        async def run(*args, **kwargs):
+            ctx = kwargs.get(ctx_name)
+            if ctx is None:
+                ctx = signature.bind_partial(*args, **kwargs).arguments.get(ctx_name)
+            session = ctx.request_context.session
+            request_id = ctx.request_context.request_id
+            partials = []
+            result = None
+            last_progress = 0.0
+            # closes the generator if the call is cancelled mid-stream
+            async with aclosing(func(*args, **kwargs)) as steps:
+                async for step in steps:
+                    if isinstance(step, Result):
+                        result = step
+                    elif isinstance(step, Progress):
+                        now = time.monotonic()
+                        done = step.total is not None and step.progress >= step.total
+                        if done or now - last_progress >= min_interval:
+                            last_progress = now
+                            await ctx.report_progress(step.progress, step.total, step.message)
+                    else:
+                        partials.append(step)
+                        await session.send_log_message(
+                            level="info", data=step, logger=logger, related_request_id=request_id
+                        )
+            return result.value if result is not None else partials
+
+        run.__signature__ = signature.replace(return_annotation=returns)
+        run.__annotations__ = {k: v for k, v in func.__annotations__.items() if k != "return"}
+        if returns is not inspect.Signature.empty:
+            run.__annotations__["return"] = returns
+        return run
+
+    return decorate(func) if func is not None else decorate
+
@@ -0,0 +1,232 @@
+"""Non-blocking structured logging for request hot paths.
+
+`print()` in middleware writes to stdout synchronously on the event loop,
+several times per request. Loggers from `get_logger()` instead put the raw
+LogRecord on a bounded in-memory queue; a background thread formats it as
+one JSON line and writes it to stderr. On the calling side a record costs a
+couple of filter checks and a `put_nowait`, and when the writer can't keep
+up, records are dropped and counted instead of blocking.
+
+Two filters run before a record is queued:
+- per-level sampling, e.g. keep 10% of INFO, 1% of DEBUG
+- rate limiting of repeated messages (same logger and format string): at
+  most `burst` per `window` seconds. The next record let through carries a
+  `suppressed` count.
+
+    log = get_logger(__name__)
+    log.info("Request completed", extra={"method": "tools/call", "duration_ms": 1.2})
+
+Configure with `configure()` or the MCP_LOG_LEVEL / MCP_LOG_SAMPLE
+("INFO=0.1,DEBUG=0.01") environment variables.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+ROOT = "mcp_app"
+
+# attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records per level (levels not listed: all)."""
+
+    def __init__(self, rates: dict[int, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.levelno)
+        return rate is None or rate >= 1.0 or random.random() < rate
+
+
+class RateLimitFilter(logging.Filter):
+    """Allow at most `burst` records per message template per `window` seconds."""
+
+    def __init__(self, burst: int = 20, window: float = 1.0, max_keys: int = 10_000):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.max_keys = max_keys
+        # (logger, template) -> [window start, count, suppressed]
+        self._windows: dict[tuple[str, str], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        now = time.monotonic()
+        key = (record.name, str(record.msg))
+        state = self._windows.get(key)
+        if state is None:
+            if len(self._windows) >= self.max_keys:
+                self._compact(now)
+            self._windows[key] = [now, 1, 0]
+            return True
+        if now - state[0] >= self.window:
+            if state[2]:
+                record.suppressed = state[2]
+            state[:] = [now, 1, 0]
+            return True
+        if state[1] < self.burst:
+            state[1] += 1
+            return True
+        state[2] += 1
+        return False
+
+    def _compact(self, now: float) -> None:
+        # windows that ended without suppressing anything carry no state
+        expired = [key for key, (start, _, suppressed) in self._windows.items()
+                   if now - start >= self.window and not suppressed]
+        for key in expired:
+            del self._windows[key]
+
+
+class _Record(logging.LogRecord):
+    """LogRecord without the caller, thread and process lookups of the stock one."""
+
+    def __init__(self, name, level, msg, args, exc_info, extra):
+        self.name = name
+        self.msg = msg
+        self.args = args
+        self.levelno = level
+        self.levelname = logging.getLevelName(level)
+        self.created = time.time()
+        self.exc_info = exc_info
+        self.exc_text = None
+        self.stack_info = None
+        if extra:
+            self.__dict__.update(extra)
+
+
+class StructuredLogger(logging.Logger):
+    """Logger whose records are cheap to build; see `get_logger()`."""
+
+    def _log(self, level, msg, args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+        if exc_info:
+            if isinstance(exc_info, BaseException):
+                exc_info = (type(exc_info), exc_info, exc_info.__traceback__)
+            elif not isinstance(exc_info, tuple):
+                exc_info = sys.exc_info()
+        self.handle(_Record(self.name, level, msg, args, exc_info, extra))
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Queue the raw record; formatting happens on the writer thread."""
+
+    def __init__(self, maxsize: int):
+        # SimpleQueue's put is lock-free C code; the bound is checked by hand
+        super().__init__(queue.SimpleQueue())
+        self.maxsize = maxsize
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.queue.qsize() >= self.maxsize:
+            self.dropped += 1
+        else:
+            self.queue.put_nowait(record)
+
+
+_lock = threading.Lock()
+_handler: NonBlockingQueueHandler | None = None
+_listener: QueueListener | None = None
+
+
+def _parse_rates(spec: str) -> dict[int, float]:
+    rates = {}
+    for part in filter(None, spec.split(",")):
+        level, _, rate = part.partition("=")
+        rates[logging.getLevelName(level.strip().upper())] = float(rate)
+    return rates
+
+
+def configure(
+    level: int | str | None = None,
+    sample_rates: dict[int, float] | None = None,
+    burst: int = 20,
+    window: float = 1.0,
+    stream=None,
+    queue_size: int = 10_000,
+) -> None:
+    """(Re)configure the `mcp_app` logger tree."""
+    global _handler, _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+        root = logging.getLogger(ROOT)
+        if _handler is not None:
+            root.removeHandler(_handler)
+
+        root.setLevel(level or os.environ.get("MCP_LOG_LEVEL", "INFO"))
+        root.propagate = False
+
+        # stderr by default: stdout carries the protocol for stdio servers
+        writer = logging.StreamHandler(stream or sys.stderr)
+        writer.setFormatter(JsonFormatter())
+        _handler = NonBlockingQueueHandler(queue_size)
+        if sample_rates is None:
+            sample_rates = _parse_rates(os.environ.get("MCP_LOG_SAMPLE", ""))
+        if sample_rates:
+            _handler.addFilter(SamplingFilter(sample_rates))
+        _handler.addFilter(RateLimitFilter(burst=burst, window=window))
+        root.addHandler(_handler)
+
+        _listener = QueueListener(_handler.queue, writer)
+        _listener.start()
+
+
+def shutdown() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(shutdown)
+
+
+_loggers: dict[str, StructuredLogger] = {}
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """A logger under `mcp_app`, configuring the pipeline on first use."""
+    if _handler is None:
+        configure()
+    logger = _loggers.get(name)
+    if logger is None:
+        # kept out of logging's global registry so its logger class is untouched
+        logger = _loggers[name] = StructuredLogger(f"{ROOT}.{name}")
+        logger.parent = logging.getLogger(ROOT)
+    return logger
+
+
+def dropped() -> int:
+    """Records dropped because the queue was full."""
+    return _handler.dropped if _handler is not None else 0
@@ -0,0 +1,169 @@
+"""Result caching for pure FastMCP tools and resources.
+
+`CachingFastMCP` is a drop-in FastMCP subclass. Tools registered with
+`cached_tool()` and resources registered with `cached_resource()` are looked
+up in a bounded LRU (with optional TTL) before FastMCP validates the
+arguments, so a repeated call skips validation and execution entirely.
+
+    mcp = CachingFastMCP("Hello World")
+
+    @mcp.cached_tool()
+    def add(a: int, b: int) -> int:
+        return a + b
+"""
+
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any
+
+from mcp.server.fastmcp import FastMCP
+
+_MISSING = object()
+
+
+def canonical_key(name: str, arguments: dict[str, Any] | None) -> str:
+    """Stable cache key: same tool and same arguments in any key order."""
+    return name + "\0" + json.dumps(
+        arguments or {}, sort_keys=True, separators=(",", ":"), default=str
+    )
+
+
+class ResultCache:
+    """A bounded LRU mapping with optional per-entry TTL and hit/miss counters."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (expires_at or None, value)
+        self._entries: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, default: Any = _MISSING) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at is None or expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.expirations += 1
+        self.misses += 1
+        return default
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class CachingFastMCP(FastMCP):
+    """FastMCP with opt-in result caching for pure tools and resources."""
+
+    def __init__(self, *args, cache_size: int = 1024, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.result_cache = ResultCache(maxsize=cache_size)
+        # tool name -> ttl
+        self._cached_tools: dict[str, float | None] = {}
+        # (uri template, uri template regex, ttl)
+        self._cached_resources: list[tuple[str, re.Pattern, float | None]] = []
+        # per tool / resource template hit and miss counts
+        self._counters: dict[str, list[int]] = {}
+
+    def cached_tool(self, ttl: float | None = None, **tool_kwargs):
+        """Like `tool()`, but results are cached. Only use for pure functions."""
+        register = self.tool(**tool_kwargs)
+
+        def decorator(fn):
+            name = tool_kwargs.get("name") or fn.__name__
+            self._cached_tools[name] = ttl
+            self._counters[name] = [0, 0]
+            return register(fn)
+
+        return decorator
+
+    def cached_resource(self, uri: str, ttl: float | None = None, **resource_kwargs):
+        """Like `resource()`, but reads are cached per concrete URI."""
+        register = self.resource(uri, **resource_kwargs)
+        pattern = re.compile(
+            "^" + re.sub(r"\\\{\w+\\\}", "[^/]+", re.escape(uri)) + "$"
+        )
+
+        def decorator(fn):
+            self._cached_resources.append((uri, pattern, ttl))
+            self._counters[uri] = [0, 0]
+            return register(fn)
+
+        return decorator
+
+    async def call_tool(self, name: str, arguments: dict[str, Any]):
+        if name not in self._cached_tools:
+            return await super().call_tool(name, arguments)
+
+        key = canonical_key(name, arguments)
+        counter = self._counters[name]
+        result = self.result_cache.get(key)
+        if result is not _MISSING:
+            counter[0] += 1
+            return result
+        counter[1] += 1
+        result = await super().call_tool(name, arguments)
+        self.result_cache.set(key, result, ttl=self._cached_tools[name])
+        return result
+
+    async def read_resource(self, uri):
+        uri = str(uri)
+        for template, pattern, ttl in self._cached_resources:
+            if pattern.match(uri):
+                break
+        else:
+            return await super().read_resource(uri)
+
+        counter = self._counters[template]
+        key = "resource\0" + uri
+        contents = self.result_cache.get(key)
+        if contents is not _MISSING:
+            counter[0] += 1
+            return contents
+        counter[1] += 1
+        # materialise, the cached value may be read many times
+        contents = list(await super().read_resource(uri))
+        self.result_cache.set(key, contents, ttl=ttl)
+        return contents
+
+    def cache_stats(self) -> dict[str, Any]:
+        """Overall cache counters plus hits/misses per tool and resource."""
+        return {
+            **self.result_cache.stats(),
+            "by_name": {
+                name: {"hits": hits, "misses": misses}
+                for name, (hits, misses) in self._counters.items()
+            },
+        }
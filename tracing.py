@@ -0,0 +1,353 @@
+"""Low-overhead tracing with batched, background export.
+
+`traced()` records a span (ids, parent, timing, status, optionally the
+call's inputs/output) and hands it to the configured `BatchSpanExporter`.
+On the calling thread that costs a few clock reads and a deque append. The
+exporter's daemon thread takes spans off the queue in batches and sends them
+to a sink (Langfuse, a JSONL file, ...), so tool latency does not depend on
+the tracing backend:
+
+- the queue is bounded; past `high_water` successful spans are sampled with
+  a probability that falls to 0 as the queue fills (error spans are kept)
+- when the queue is full, spans are dropped, or with `spill_path` set, moved
+  to an overflow buffer that the export thread appends to a local JSONL file
+- a failed batch goes to the spill file too, if there is one
+- the spill file is capped at `spill_max_bytes`: past that, the oldest
+  spans are dropped so it keeps about the newest half
+
+    set_exporter(BatchSpanExporter(LangfuseSink(langfuse), spill_path="/var/tmp/traces_spill.jsonl"))
+
+    @traced(name="tool_method")
+    def tool_method(x): ...
+
+With no exporter configured, `traced` functions run untraced.
+"""
+
+import atexit
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, Protocol
+
+
+@dataclass(slots=True)
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    name: str
+    start: float
+    duration: float = 0.0
+    status: str = "ok"
+    error: str | None = None
+    input: Any = None
+    output: Any = None
+    attributes: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        # shallow: asdict() would deep-copy the captured arguments
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class SpanSink(Protocol):
+    def export(self, spans: list[Span]) -> None: ...
+
+
+def _write_jsonl(path: str, spans: Iterable[Span]) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        for span in spans:
+            f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+def _trim_jsonl(path: str, keep_bytes: int) -> int:
+    """Keep about the last `keep_bytes` of whole lines; returns the lines dropped."""
+    with open(path, "rb") as f:
+        data = f.read()
+    cut = max(0, len(data) - keep_bytes)
+    # start at a line boundary, never in the middle of a span
+    cut = data.find(b"\n", cut - 1) + 1 if cut else 0
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data[cut:])
+    os.replace(tmp, path)
+    return data.count(b"\n", 0, cut)
+
+
+class JsonlFileSink:
+    """Append spans to a local JSONL file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: list[Span]) -> None:
+        _write_jsonl(self.path, spans)
+
+
+class LangfuseSink:
+    """Send spans to Langfuse through its batch ingestion API.
+
+    Spans are already finished when exported, so they are sent as
+    `span-create` events with explicit start/end times (plus a
+    `trace-create` for spans that start a trace).
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def export(self, spans: list[Span]) -> None:
+        from langfuse.api import (
+            CreateSpanBody,
+            IngestionEvent_SpanCreate,
+            IngestionEvent_TraceCreate,
+            TraceBody,
+        )
+
+        now = datetime.now(timezone.utc).isoformat()
+        events = []
+        for span in spans:
+            start = datetime.fromtimestamp(span.start, timezone.utc)
+            if span.parent_id is None and not span.attributes.get("client_trace"):
+                events.append(IngestionEvent_TraceCreate(
+                    id=_new_id(64), timestamp=now,
+                    body=TraceBody(id=span.trace_id, name=span.name, timestamp=start),
+                ))
+            events.append(IngestionEvent_SpanCreate(
+                id=_new_id(64), timestamp=now,
+                body=CreateSpanBody(
+                    id=span.span_id,
+                    trace_id=span.trace_id,
+                    parent_observation_id=span.parent_id,
+                    name=span.name,
+                    start_time=start,
+                    end_time=datetime.fromtimestamp(span.start + span.duration, timezone.utc),
+                    input=_jsonable(span.input),
+                    output=_jsonable(span.output),
+                    metadata=span.attributes or None,
+                    level="ERROR" if span.status == "error" else None,
+                    status_message=span.error,
+                ),
+            ))
+        self.client.api.ingestion.batch(batch=events)
+
+
+def _jsonable(value: Any) -> Any:
+    return None if value is None else json.loads(json.dumps(value, default=str))
+
+
+class BatchSpanExporter:
+    """Bounded span queue drained in batches by a daemon thread."""
+
+    def __init__(
+        self,
+        sink: SpanSink,
+        max_queue: int = 2048,
+        batch_size: int = 128,
+        flush_interval: float = 1.0,
+        high_water: float = 0.5,
+        spill_path: str | None = None,
+        spill_max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.sink = sink
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.high_water = int(max_queue * high_water)
+        self.spill_path = spill_path
+        self.spill_max_bytes = spill_max_bytes
+        # deque append/popleft are atomic, so producers never take a lock
+        self._queue: deque[Span] = deque()
+        self._overflow: deque[Span] = deque()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._export_lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.spilled = 0
+        self.export_errors = 0
+        self.last_export_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span) -> None:
+        queued = len(self._queue)
+        if queued >= self.high_water and span.status == "ok":
+            keep = (self.max_queue - queued) / (self.max_queue - self.high_water)
+            if random.random() >= keep:
+                self.sampled_out += 1
+                return
+        if queued >= self.max_queue:
+            if self.spill_path and len(self._overflow) < self.max_queue:
+                self._overflow.append(span)
+            else:
+                self.dropped += 1
+            return
+        self._queue.append(span)
+        if queued + 1 == self.batch_size:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Export everything queued so far (blocks until done)."""
+        with self._export_lock:
+            while self._queue:
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                start = time.perf_counter()
+                try:
+                    self.sink.export(batch)
+                    self.exported += len(batch)
+                except Exception:
+                    self.export_errors += 1
+                    self._spill(batch)
+                self.last_export_seconds = time.perf_counter() - start
+            if self._overflow:
+                self._spill([self._overflow.popleft() for _ in range(len(self._overflow))])
+
+    def _spill(self, spans: list[Span]) -> None:
+        if not self.spill_path:
+            self.dropped += len(spans)
+            return
+        try:
+            _write_jsonl(self.spill_path, spans)
+            self.spilled += len(spans)
+            if os.path.getsize(self.spill_path) > self.spill_max_bytes:
+                self.dropped += _trim_jsonl(self.spill_path, self.spill_max_bytes // 2)
+        except OSError:
+            self.dropped += len(spans)
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "overflow": len(self._overflow),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "spilled": self.spilled,
+            "export_errors": self.export_errors,
+            "last_export_ms": round(self.last_export_seconds * 1000, 3),
+        }
+
+
+_exporter: BatchSpanExporter | None = None
+_current: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def set_exporter(exporter: BatchSpanExporter | None) -> None:
+    """Install the process-wide exporter, shutting down the previous one."""
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    if previous is not None:
+        previous.shutdown()
+
+
+def get_exporter() -> BatchSpanExporter | None:
+    return _exporter
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+@atexit.register
+def _shutdown() -> None:
+    if _exporter is not None:
+        _exporter.shutdown()
+
+
+def _start_span(name: str, args: tuple, kwargs: dict, capture_io: bool) -> Span:
+    parent = _current.get()
+    if parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        # continue a trace the client started (same kwarg langfuse's observe reads)
+        trace_id, parent_id = kwargs.get("langfuse_trace_id"), None
+    span = Span(trace_id or _new_id(128), _new_id(64), parent_id, name, time.time())
+    if parent_id is None and trace_id:
+        span.attributes["client_trace"] = True
+    if capture_io:
+        # serialized on the export thread, not here
+        span.input = {"args": args, "kwargs": kwargs}
+    return span
+
+
+def _finish_span(span: Span, started: float, error: BaseException | None, result: Any, capture_io: bool) -> None:
+    span.duration = time.perf_counter() - started
+    if error is not None:
+        span.status = "error"
+        span.error = f"{type(error).__name__}: {error}"
+    elif capture_io:
+        span.output = result
+    exporter = _exporter
+    if exporter is not None:
+        exporter.submit(span)
+
+
+def traced(name: str | None = None, capture_io: bool = True) -> Callable:
+    """Decorator recording a span per call of a sync or async function."""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _exporter is None:
+                    return await func(*args, **kwargs)
+                span = _start_span(span_name, args, kwargs, capture_io)
+                token = _current.set(span)
+                started = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException as e:
+                    _finish_span(span, started, e, None, capture_io)
+                    raise
+                finally:
+                    _current.reset(token)
+                _finish_span(span, started, None, result, capture_io)
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _exporter is None:
+                return func(*args, **kwargs)
+            span = _start_span(span_name, args, kwargs, capture_io)
+            token = _current.set(span)
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                _finish_span(span, started, e, None, capture_io)
+                raise
+            finally:
+                _current.reset(token)
+            _finish_span(span, started, None, result, capture_io)
+            return result
+
+        return wrapper
+
+    return decorator
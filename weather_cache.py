@@ -0,0 +1,287 @@
+"""Tiered stale-while-revalidate cache in front of a weather upstream.
+
+    cache = WeatherCache(LocalUpstream(weather), ttl=300, sqlite_path="weather_cache.db")
+    observation = await cache.get("New York")
+
+Entries are keyed by normalised location and time bucket. Time is cut
+into buckets of the location's TTL, so every worker agrees on when an
+entry goes stale. Names are normalised like the gazetteer does it, and
+"lat,lon" is rounded to two decimals (about a kilometre). Lookups try the
+in-process LRU (L1), then the optional SQLite file (L2), which workers
+share and which survives restarts.
+
+- A fresh entry (current bucket) is returned as is.
+- Otherwise, if the location's latest value was fetched less than
+  `stale_ttl` ago, that stale value is returned immediately. At the same
+  time, one background refresh per key fetches the new bucket. While
+  refreshes fail, the stale value keeps being served, and after a failure
+  the location is not refreshed again for `failure_backoff` seconds, so an
+  upstream outage is not met with one retry per request.
+- On a miss, the caller waits for the upstream. Concurrent misses for a
+  key share one fetch.
+- Unknown locations (`NotFound`) are cached too, for `negative_ttl`, so
+  typos don't hit the upstream on every call.
+
+`ttls` overrides the TTL per location: volatile places refresh more often,
+stable ones less. Outcomes are counted in `weather_cache_requests_total`,
+and upstream latency goes to `weather_upstream_seconds`. `aclose()` stops
+the refreshes and closes the upstream's connections; call it on shutdown.
+"""
+
+import asyncio
+import dataclasses
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from urllib.parse import quote
+
+from metrics import REGISTRY
+from singleflight import SingleFlight
+from structured_log import get_logger
+from weather_data import WeatherData, normalize_place, parse_lat_lon
+
+log = get_logger("weather_cache")
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "weather_cache_requests_total", "Weather lookups by cache outcome.", ["result"])
+UPSTREAM_DURATION = REGISTRY.histogram(
+    "weather_upstream_seconds", "Weather upstream fetch latency.", ["outcome"])
+
+
+class NotFound(LookupError):
+    """The upstream does not know the location; cached as a negative entry."""
+
+
+class LocalUpstream:
+    """The in-process station dataset (weather_data) as an upstream."""
+
+    def __init__(self, weather: WeatherData):
+        self.weather = weather
+
+    async def fetch(self, location: str) -> dict:
+        try:
+            return dataclasses.asdict(self.weather.lookup(location))
+        except ValueError as e:
+            raise NotFound(str(e)) from None
+
+    async def aclose(self) -> None:
+        pass
+
+
+class HTTPUpstream:
+    """A JSON weather API: `url` has a {location} placeholder; 404 means unknown location."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        import httpx
+
+        self.url = url
+        self.client = httpx.AsyncClient(timeout=timeout)
+
+    async def fetch(self, location: str) -> dict:
+        response = await self.client.get(self.url.format(location=quote(location)))
+        if response.status_code == 404:
+            raise NotFound(f"Unknown location: {location!r}")
+        response.raise_for_status()
+        return response.json()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+@dataclass(frozen=True)
+class Entry:
+    # None for a negative entry
+    value: dict | None
+    fetched_at: float
+    # fresh until; then servable as stale until fetched_at + stale_ttl
+    expires_at: float
+    error: str | None = None
+
+
+def location_key(location: str) -> str:
+    coordinates = parse_lat_lon(location)
+    if coordinates is not None:
+        return f"{coordinates[0]:.2f},{coordinates[1]:.2f}"
+    return normalize_place(location)
+
+
+class SQLiteTier:
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS weather_cache (key TEXT PRIMARY KEY, value TEXT, "
+                "fetched_at REAL, expires_at REAL, error TEXT, keep_until REAL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def get(self, key: str) -> Entry | None:
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT value, fetched_at, expires_at, error FROM weather_cache WHERE key = ? AND keep_until > ?",
+                (key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        return Entry(json.loads(row[0]) if row[0] is not None else None, row[1], row[2], row[3])
+
+    def put(self, key: str, entry: Entry, keep_until: float) -> None:
+        value = json.dumps(entry.value) if entry.value is not None else None
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO weather_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, value, entry.fetched_at, entry.expires_at, entry.error, keep_until),
+            )
+
+    def purge(self) -> int:
+        with self._connect() as db:
+            return db.execute("DELETE FROM weather_cache WHERE keep_until <= ?", (time.time(),)).rowcount
+
+
+class WeatherCache:
+    def __init__(self, upstream, ttl: float = 300.0, stale_ttl: float = 3600.0, negative_ttl: float = 60.0,
+                 ttls: dict[str, float] | None = None, maxsize: int = 4096, sqlite_path: str | None = None,
+                 purge_every: float = 300.0, failure_backoff: float = 30.0):
+        self.upstream = upstream
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.ttls = {location_key(location): seconds for location, seconds in (ttls or {}).items()}
+        self.maxsize = maxsize
+        self.l2 = SQLiteTier(sqlite_path) if sqlite_path else None
+        self._l1: OrderedDict[str, Entry] = OrderedDict()
+        self._fetches = SingleFlight("weather_upstream")
+        # background refreshes in flight, keyed like the entries they fill
+        self._refreshing: dict[str, asyncio.Task] = {}
+        # latest-value key -> monotonic time before which no refresh is tried
+        self.failure_backoff = failure_backoff
+        self._backoff_until: dict[str, float] = {}
+        self.purge_every = purge_every
+        self._next_purge = time.monotonic() + purge_every
+
+    def _keys(self, location: str, now: float) -> tuple[str, str, float]:
+        """(current bucket key, latest-value key, end of the current bucket)."""
+        loc = location_key(location)
+        ttl = self.ttls.get(loc, self.ttl)
+        bucket = int(now // ttl)
+        return f"{loc}|{bucket}", f"{loc}|latest", (bucket + 1) * ttl
+
+    async def _lookup(self, key: str) -> tuple[Entry | None, str]:
+        entry = self._l1.get(key)
+        if entry is not None:
+            self._l1.move_to_end(key)
+            return entry, "l1"
+        if self.l2 is not None:
+            entry = await asyncio.to_thread(self.l2.get, key)
+            if entry is not None:
+                self._remember(key, entry)
+                return entry, "l2"
+        return None, "miss"
+
+    def _remember(self, key: str, entry: Entry) -> None:
+        self._l1[key] = entry
+        self._l1.move_to_end(key)
+        while len(self._l1) > self.maxsize:
+            self._l1.popitem(last=False)
+
+    async def get(self, location: str) -> dict:
+        now = time.time()
+        if time.monotonic() >= self._next_purge:
+            await self.purge()
+        key, latest_key, bucket_end = self._keys(location, now)
+
+        entry, tier = await self._lookup(key)
+        if entry is not None and entry.expires_at > now:
+            return self._answer(entry, f"hit_{tier}")
+
+        stale, _ = await self._lookup(latest_key)
+        if stale is not None and now - stale.fetched_at >= self.stale_ttl:
+            stale = None
+        if stale is not None:
+            self._refresh_in_background(location, key, latest_key, bucket_end)
+            return self._answer(stale, "stale")
+
+        CACHE_REQUESTS.labels("miss").inc()
+        return self._answer(
+            await self._fetches.do(key, lambda: self._fetch(location, key, latest_key, bucket_end)), None)
+
+    def _answer(self, entry: Entry, result: str | None) -> dict:
+        if result is not None:
+            CACHE_REQUESTS.labels("negative" if entry.value is None else result).inc()
+        if entry.value is None:
+            raise NotFound(entry.error)
+        return entry.value
+
+    async def _fetch(self, location: str, key: str, latest_key: str, bucket_end: float) -> Entry:
+        started = time.perf_counter()
+        now = time.time()
+        try:
+            value = await self.upstream.fetch(location)
+        except NotFound as e:
+            UPSTREAM_DURATION.labels("not_found").observe(time.perf_counter() - started)
+            entry = Entry(None, now, min(now + self.negative_ttl, bucket_end), error=str(e))
+        except Exception:
+            UPSTREAM_DURATION.labels("error").observe(time.perf_counter() - started)
+            raise
+        else:
+            UPSTREAM_DURATION.labels("ok").observe(time.perf_counter() - started)
+            entry = Entry(value, now, bucket_end)
+            # what stale reads fall back to once this bucket has passed
+            await self._store(latest_key, entry)
+        await self._store(key, entry)
+        return entry
+
+    async def _store(self, key: str, entry: Entry) -> None:
+        self._remember(key, entry)
+        if self.l2 is not None:
+            # kept while it can still be served, fresh or stale
+            keep_until = max(entry.expires_at, entry.fetched_at + self.stale_ttl if entry.value is not None else 0)
+            await asyncio.to_thread(self.l2.put, key, entry, keep_until)
+
+    def _refresh_in_background(self, location: str, key: str, latest_key: str, bucket_end: float) -> None:
+        if key in self._refreshing:
+            return
+        backoff_until = self._backoff_until.get(latest_key)
+        if backoff_until is not None:
+            if time.monotonic() < backoff_until:
+                return
+            del self._backoff_until[latest_key]
+
+        async def refresh():
+            try:
+                await self._fetches.do(key, lambda: self._fetch(location, key, latest_key, bucket_end))
+            except Exception as e:
+                # keep serving the stale entry; stale hits try again after the backoff
+                self._backoff_until[latest_key] = time.monotonic() + self.failure_backoff
+                log.warning("Weather refresh failed", extra={"location": location, "error": repr(e)})
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.get_running_loop().create_task(refresh())
+
+    async def purge(self) -> int:
+        """Drop entries that can no longer be served; returns how many rows left L2."""
+        self._next_purge = time.monotonic() + self.purge_every
+        now = time.time()
+        for key in [k for k, e in self._l1.items() if max(e.expires_at, e.fetched_at + self.stale_ttl) <= now]:
+            del self._l1[key]
+        monotonic = time.monotonic()
+        for key in [k for k, until in self._backoff_until.items() if until <= monotonic]:
+            del self._backoff_until[key]
+        return await asyncio.to_thread(self.l2.purge) if self.l2 is not None else 0
+
+    async def aclose(self) -> None:
+        """Cancel background refreshes and close the upstream."""
+        tasks = list(self._refreshing.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.upstream.aclose()
+
+    def stats(self) -> dict:
+        return {"l1_size": len(self._l1), "refreshing": len(self._refreshing),
+                "backing_off": len(self._backoff_until), "upstream": self._fetches.stats()}
@@ -0,0 +1,297 @@
+"""Local weather observations with a gazetteer and a nearest-station index.
+
+The dataset is a CSV (or, with pyarrow installed, a Parquet file) with one
+row per station: station_id, name, lat, lon, observed_at and the
+observation columns. On load, every column is written once as a .npy file
+under `data/.npy/` and mapped back with `np.load(mmap_mode="r")`. So the
+process holds views into the page cache instead of parsed rows, and all
+workers on a host share the same pages.
+
+Place names are resolved through a gazetteer CSV (name, lat, lon,
+country). "lat,lon" strings work as well. The nearest station comes from
+`GridIndex`, which buckets stations by latitude/longitude cell and
+searches outward ring by ring. A lookup is a few dictionary probes plus a
+haversine over a handful of candidates, typically microseconds.
+
+`WeatherData.lookup()` polls the files' mtimes at most once per
+`check_interval`. When one changes, a thread builds a new `Snapshot`
+and swaps it in whole. Lookups keep using the old snapshot until then, so
+they never wait on a reload or see a half-built one.
+
+    weather = WeatherData("data/stations.csv", "data/gazetteer.csv")
+    weather.lookup("New York")   # -> Observation(...)
+"""
+
+import csv
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from structured_log import get_logger
+
+log = get_logger("weather_data")
+
+EARTH_RADIUS_KM = 6371.0088
+# columns read as numbers; everything else is kept as text
+NUMERIC_COLUMNS = {"lat", "lon", "temperature_c", "humidity_pct", "wind_kph"}
+_LAT_LON = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+def normalize_place(name: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive place key."""
+    return " ".join(re.sub(r"[^\w\s]", " ", name.casefold()).split())
+
+
+def parse_lat_lon(location: str) -> tuple[float, float] | None:
+    """(lat, lon) for a "lat,lon" string, None for anything else."""
+    match = _LAT_LON.match(location)
+    if not match:
+        return None
+    lat, lon = float(match[1]), float(match[2])
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f"Coordinates out of range: {location}")
+    return lat, lon
+
+
+def _read_table(path: Path) -> dict[str, list]:
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq  # optional dependency
+
+        return pq.read_table(path).to_pydict()
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        raise ValueError(f"{path} has no rows")
+    return {column: [row[column] for row in rows] for column in rows[0]}
+
+
+def _to_array(column: str, values: list) -> np.ndarray:
+    if column in NUMERIC_COLUMNS:
+        return np.array([float(v) if v not in ("", None) else np.nan for v in values], dtype=np.float64)
+    return np.array([str(v) for v in values], dtype=np.str_)
+
+
+def load_columns(path: Path, cache_dir: Path) -> dict[str, np.ndarray]:
+    """The table's columns as read-only memory maps, converting from CSV/Parquet once per file version."""
+    stat = path.stat()
+    version_dir = cache_dir / path.stem / f"{stat.st_mtime_ns}-{stat.st_size}"
+    if not (version_dir / "_complete").exists():
+        # write to a temp dir and rename, so a concurrent reader never maps half a column
+        tmp_dir = version_dir.with_name(version_dir.name + f".tmp{os.getpid()}")
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        for column, values in _read_table(path).items():
+            np.save(tmp_dir / f"{column}.npy", _to_array(column, values))
+        (tmp_dir / "_complete").touch()
+        try:
+            tmp_dir.rename(version_dir)
+        except OSError:
+            # another process got there first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        # older versions; mapped files may still be open (Windows), so best effort
+        for old in (cache_dir / path.stem).iterdir():
+            if old.name != version_dir.name and ".tmp" not in old.name:
+                shutil.rmtree(old, ignore_errors=True)
+    return {
+        column.stem: np.load(column, mmap_mode="r")
+        for column in version_dir.glob("*.npy")
+    }
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance; works on scalars and numpy arrays."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def _haversine_rad(lat1: float, lon1: float, cos_lat1: float, lat2: float, lon2: float, cos_lat2: float) -> float:
+    a = math.sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos_lat2 * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+class GridIndex:
+    """Nearest-point search over latitude/longitude cells of `cell_deg` degrees."""
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, cell_deg: float | None = None, max_ring: int = 6):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        if cell_deg is None:
+            # about one point per cell if they were spread evenly over the globe
+            cell_deg = min(10.0, max(0.1, math.sqrt(180 * 360 / max(len(self.lat), 1))))
+        self.cell_deg = cell_deg
+        self.max_ring = max_ring
+        self.columns = math.ceil(360 / cell_deg)
+        rows = np.floor((self.lat + 90) / cell_deg).astype(np.int64)
+        cols = np.floor((self.lon + 180) / cell_deg).astype(np.int64) % self.columns
+        lat_rad, lon_rad = np.radians(self.lat), np.radians(self.lon)
+        # cell -> [(index, lat, lon, cos lat)], radians; scoring a handful of
+        # candidates in plain floats beats numpy's per-call overhead
+        self.cells: dict[tuple[int, int], list[tuple[int, float, float, float]]] = {}
+        for i, (row, col, la, lo) in enumerate(zip(rows.tolist(), cols.tolist(), lat_rad.tolist(), lon_rad.tolist())):
+            self.cells.setdefault((row, col), []).append((i, la, lo, math.cos(la)))
+
+    def _ring(self, row: int, col: int, ring: int):
+        if ring == 0:
+            yield row, col
+            return
+        for dc in range(-ring, ring + 1):
+            yield row - ring, (col + dc) % self.columns
+            yield row + ring, (col + dc) % self.columns
+        for dr in range(-ring + 1, ring):
+            yield row + dr, (col - ring) % self.columns
+            yield row + dr, (col + ring) % self.columns
+
+    def _beyond_km(self, lat: float, ring: int) -> float:
+        """A lower bound on the distance to any point outside rings 0..`ring`.
+
+        Such a point is more than `ring` rows away (latitude differs by at
+        least ring cells), or within those rows but more than `ring`
+        columns away. In the second case haversine gives
+        a >= cos(max |lat|)^2 * sin(dlon / 2)^2.
+        """
+        step = math.radians(self.cell_deg) * ring
+        max_lat = math.radians(min(abs(lat) + (ring + 1) * self.cell_deg, 90.0))
+        across = 2 * EARTH_RADIUS_KM * math.asin(math.cos(max_lat) * math.sin(min(step, math.pi) / 2))
+        return min(step * EARTH_RADIUS_KM, across)
+
+    def nearest(self, lat: float, lon: float) -> tuple[int, float]:
+        """(index, distance in km) of the closest point."""
+        row = math.floor((lat + 90) / self.cell_deg)
+        col = math.floor((lon + 180) / self.cell_deg) % self.columns
+        q_lat, q_lon = math.radians(lat), math.radians(lon)
+        q_cos = math.cos(q_lat)
+        cells = self.cells
+        best, best_km = -1, math.inf
+        for ring in range(self.max_ring + 1):
+            for cell in self._ring(row, col, ring):
+                for i, p_lat, p_lon, p_cos in cells.get(cell, ()):
+                    km = _haversine_rad(q_lat, q_lon, q_cos, p_lat, p_lon, p_cos)
+                    if km < best_km:
+                        best, best_km = i, km
+            if best >= 0 and best_km <= self._beyond_km(lat, ring):
+                return best, best_km
+        # sparse data or near a pole: a vectorised scan over every point is still fast
+        distances = haversine_km(lat, lon, self.lat, self.lon)
+        best = int(np.argmin(distances))
+        return best, float(distances[best])
+
+
+@dataclass(frozen=True)
+class Observation:
+    place: str
+    station_id: str
+    station: str
+    distance_km: float
+    observed_at: str
+    temperature_c: float
+    humidity_pct: float
+    wind_kph: float
+    conditions: str
+
+    def describe(self) -> str:
+        return (
+            f"{self.place}: {self.temperature_c:.1f}°C, {self.conditions}, "
+            f"humidity {self.humidity_pct:.0f}%, wind {self.wind_kph:.0f} km/h "
+            f"(station {self.station_id} {self.station}, {self.distance_km:.1f} km away, "
+            f"observed {self.observed_at})"
+        )
+
+
+class Snapshot:
+    """One immutable version of the dataset, gazetteer and index."""
+
+    def __init__(self, stations: dict[str, np.ndarray], gazetteer: dict[str, np.ndarray], versions: tuple):
+        self.stations = stations
+        self.versions = versions
+        self.index = GridIndex(stations["lat"], stations["lon"])
+        # normalised name -> (display name, lat, lon)
+        self.places = {
+            normalize_place(name): (str(name), float(lat), float(lon))
+            for name, lat, lon in zip(gazetteer["name"], gazetteer["lat"], gazetteer["lon"])
+        }
+
+    def resolve(self, location: str) -> tuple[str, float, float]:
+        coordinates = parse_lat_lon(location)
+        if coordinates is not None:
+            lat, lon = coordinates
+            return f"{lat:.4f},{lon:.4f}", lat, lon
+        place = self.places.get(normalize_place(location))
+        if place is None:
+            raise ValueError(f"Unknown location: {location!r}; try a city name or 'lat,lon'")
+        return place
+
+    def lookup(self, location: str) -> Observation:
+        place, lat, lon = self.resolve(location)
+        i, distance = self.index.nearest(lat, lon)
+        s = self.stations
+        return Observation(
+            place=place,
+            station_id=str(s["station_id"][i]),
+            station=str(s["name"][i]),
+            distance_km=distance,
+            observed_at=str(s["observed_at"][i]),
+            temperature_c=float(s["temperature_c"][i]),
+            humidity_pct=float(s["humidity_pct"][i]),
+            wind_kph=float(s["wind_kph"][i]),
+            conditions=str(s["conditions"][i]),
+        )
+
+
+class WeatherData:
+    def __init__(self, stations_path: str | os.PathLike, gazetteer_path: str | os.PathLike,
+                 cache_dir: str | os.PathLike | None = None, check_interval: float = 1.0):
+        self.stations_path = Path(stations_path)
+        self.gazetteer_path = Path(gazetteer_path)
+        self.cache_dir = Path(cache_dir) if cache_dir else self.stations_path.parent / ".npy"
+        self.check_interval = check_interval
+        self._next_check = time.monotonic() + check_interval
+        self._reloading = False
+        self.reloads = 0
+        self.snapshot = self._build()
+
+    def _versions(self) -> tuple:
+        return tuple((p.stat().st_mtime_ns, p.stat().st_size) for p in (self.stations_path, self.gazetteer_path))
+
+    def _build(self) -> Snapshot:
+        versions = self._versions()
+        return Snapshot(
+            load_columns(self.stations_path, self.cache_dir),
+            load_columns(self.gazetteer_path, self.cache_dir),
+            versions,
+        )
+
+    def maybe_reload(self) -> None:
+        """Start a background reload if a file changed since the current snapshot."""
+        now = time.monotonic()
+        if now < self._next_check or self._reloading:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            changed = self._versions() != self.snapshot.versions
+        except OSError:
+            # mid-replace; try again on the next check
+            return
+        if changed:
+            self._reloading = True
+            threading.Thread(target=self._reload, name="weather-reload", daemon=True).start()
+
+    def _reload(self) -> None:
+        try:
+            self.snapshot = self._build()
+            self.reloads += 1
+            log.info("Weather data reloaded", extra={"stations": len(self.snapshot.stations["lat"])})
+        except Exception as e:
+            log.warning("Weather data reload failed, keeping the previous version", extra={"error": repr(e)})
+        finally:
+            self._reloading = False
+
+    def lookup(self, location: str) -> Observation:
+        self.maybe_reload()
+        return self.snapshot.lookup(location)
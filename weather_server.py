@@ -1,13 +1,70 @@
 # weather_server.py
-from typing import List
-from mcp.server.fastmcp import FastMCP
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+from fastmcp.exceptions import ToolError
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.routing import Mount
 
-mcp = FastMCP("Weather")
+from admission import AdmissionControlMiddleware, Limit
+from catalog_cache import CatalogFastMCP
+from metrics import MCPMetricsMiddleware, metrics_response
+from singleflight import SingleFlightMiddleware
+from weather_cache import HTTPUpstream, LocalUpstream, NotFound, WeatherCache
+from weather_data import Observation, WeatherData
 
-@mcp.tool()
+DATA_DIR = Path(os.environ.get("WEATHER_DATA_DIR", Path(__file__).parent / "data"))
+
+mcp = CatalogFastMCP("Weather")
+# local observations + gazetteer, memory-mapped; edits to the files are picked up live
+weather = WeatherData(DATA_DIR / "stations.csv", DATA_DIR / "gazetteer.csv")
+# stale-while-revalidate in front of the upstream: the local dataset, or a JSON
+# API returning the same fields when WEATHER_UPSTREAM_URL (with {location}) is set
+upstream_url = os.environ.get("WEATHER_UPSTREAM_URL")
+weather_cache = WeatherCache(
+    HTTPUpstream(upstream_url) if upstream_url else LocalUpstream(weather),
+    ttl=float(os.environ.get("WEATHER_CACHE_TTL", 300)),
+    sqlite_path=os.environ.get("WEATHER_CACHE_DB"),
+)
+# latency/error metrics outermost, so shed calls are counted too
+mcp.add_middleware(MCPMetricsMiddleware())
+# identical concurrent calls to idempotent tools share one execution (and one admission slot)
+mcp.add_middleware(SingleFlightMiddleware(mcp))
+# bounded concurrency: a burst of calls queues briefly, then is shed with a retryable error
+mcp.add_middleware(AdmissionControlMiddleware(
+    global_limit=Limit(concurrency=32, queue=64, timeout=1.0),
+    tool_limits={"get_weather": Limit(concurrency=16, queue=32, timeout=0.5)},
+))
+
+@mcp.tool(annotations={"idempotentHint": True})
 async def get_weather(location: str) -> str:
-    """Get weather for location."""
-    return "It's always sunny in New York"
+    """Get current weather for a place name (e.g. "New York") or "lat,lon"."""
+    try:
+        return Observation(**await weather_cache.get(location)).describe()
+    except (NotFound, ValueError) as e:
+        # unknown places, and malformed or out-of-range coordinates
+        raise ToolError(str(e)) from None
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_route(request: Request):
+    """Prometheus metrics, including admission queue depth and rejections."""
+    return metrics_response()
+
+mcp_app = mcp.http_app(transport="streamable-http")
+
+@asynccontextmanager
+async def app_lifespan(app):
+    # FastMCP's own lifespan runs per session; the cache lives as long as the process
+    async with mcp_app.lifespan(app):
+        try:
+            yield
+        finally:
+            await weather_cache.aclose()
+
+app = Starlette(routes=[Mount("", app=mcp_app)], lifespan=app_lifespan)
 
 if __name__ == "__main__":
-    mcp.run(transport="streamable-http")
+    import uvicorn
+
+    uvicorn.run(app)